@@ -8,6 +8,10 @@ DEFAULT_CONFIG_PATHS = {
     "ocr_extraction": "config/ocr_extraction.toml",
     "import_generator": "config/import_generator.toml",
 }
+DEFAULT_PIPELINE_SETTINGS = {
+    # Pass frames from extraction to OCR in memory instead of via PNG files.
+    "streaming": False,
+}
 
 
 def ensure_directory(path):
@@ -19,7 +23,10 @@ def create_main_config_if_not_exists():
     """Create main_config.toml if it does not exist, with default step config paths."""
     ensure_directory(os.path.dirname(MAIN_CONFIG_PATH))
     if not os.path.exists(MAIN_CONFIG_PATH):
-        default_main_config = {"steps": DEFAULT_CONFIG_PATHS}
+        default_main_config = {
+            "steps": DEFAULT_CONFIG_PATHS,
+            "pipeline": DEFAULT_PIPELINE_SETTINGS,
+        }
         with open(MAIN_CONFIG_PATH, "w") as f:
             toml.dump(default_main_config, f)
         print(f"[Init] Created default main config at: {MAIN_CONFIG_PATH}")
@@ -30,18 +37,27 @@ def create_main_config_if_not_exists():
 # === ENTRY POINT ===
 if __name__ == "__main__":
     create_main_config_if_not_exists()
+    main_config = toml.load(MAIN_CONFIG_PATH)
+    streaming = main_config.get("pipeline", {}).get("streaming", False)
 
-    # STEP 1: Frame Extraction
-    from pipeline.frame_extractor import run_from_config as frame_extraction
+    if streaming:
+        # STEP 1 + 2: Frame Extraction streamed into OCR Extraction
+        from pipeline.ocr_extractor import run_streaming_from_config
 
-    frame_extraction(MAIN_CONFIG_PATH)
-    print("\n\n\n")
+        run_streaming_from_config(MAIN_CONFIG_PATH)
+        print("\n\n\n")
+    else:
+        # STEP 1: Frame Extraction
+        from pipeline.frame_extractor import run_from_config as frame_extraction
 
-    # STEP 2: OCR Extraction
-    from pipeline.ocr_extractor import run_from_config as ocr_extraction
+        frame_extraction(MAIN_CONFIG_PATH)
+        print("\n\n\n")
 
-    ocr_extraction(MAIN_CONFIG_PATH)
-    print("\n\n\n")
+        # STEP 2: OCR Extraction
+        from pipeline.ocr_extractor import run_from_config as ocr_extraction
+
+        ocr_extraction(MAIN_CONFIG_PATH)
+        print("\n\n\n")
 
     # STEP 3: Import Generation
     from pipeline.import_generator import run_from_config as import_generation
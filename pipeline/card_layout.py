@@ -0,0 +1,282 @@
+import re
+
+import cv2
+import numpy as np
+
+from pipeline.frame_writer import load_frame, to_gray
+
+# Title and status areas as (left, top, right, bottom) fractions of a card.
+DEFAULT_TITLE_BOX = (0.02, 0.0, 0.7, 0.5)
+DEFAULT_STATUS_BOX = (0.72, 0.15, 0.98, 0.75)
+# Runs of card rows shorter than this share of the panel are not cards.
+MIN_CARD_HEIGHT = 0.05
+# Dark rows inside a card (icons, text lines) shorter than this are bridged.
+MAX_ROW_GAP = 3
+# Cards starting or ending this close (share of the panel) to the top or
+# bottom may be cut off.
+EDGE_MARGIN = 0.02
+# Status text of completed cards, and the progress ("3/10") of the others.
+COMPLETED_TEXT = "Completed"
+PROGRESS_PATTERN = re.compile(r"\d+\s*/\s*\d+")
+
+
+def find_cards(gray, min_height: float = MIN_CARD_HEIGHT):
+    """Return `(x0, y0, x1, y1)` of every card in a panel frame, top to bottom.
+
+    Cards are the bright rectangles on the darker panel background: an Otsu
+    threshold separates the two, rows that are mostly bright form a card's
+    vertical extent and its columns give the horizontal one. Cards cut by
+    the top or bottom edge are kept only if they are nearly full height.
+    """
+    _, mask = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    height = gray.shape[0]
+    rows = mask.mean(axis=1) > 0.5
+
+    runs = []
+    start = None
+    gap = 0
+    for y, bright in enumerate(rows):
+        if bright:
+            if start is None:
+                start = y
+            gap = 0
+        elif start is not None:
+            gap += 1
+            if gap > MAX_ROW_GAP:
+                runs.append((start, y - gap + 1))
+                start = None
+                gap = 0
+    if start is not None:
+        runs.append((start, height - gap))
+
+    runs = [(y0, y1) for y0, y1 in runs if y1 - y0 >= min_height * height]
+    # The panel crop keeps a few pixels of margin around the list.
+    margin = max(MAX_ROW_GAP, int(EDGE_MARGIN * height))
+    interior = [y1 - y0 for y0, y1 in runs if y0 > margin and y1 < height - margin]
+    if interior:
+        full_height = max(interior)
+        runs = [(y0, y1) for y0, y1 in runs if y1 - y0 >= 0.9 * full_height]
+
+    cards = []
+    for y0, y1 in runs:
+        columns = np.flatnonzero(mask[y0:y1].mean(axis=0) > 0.5)
+        if columns.size:
+            cards.append((int(columns[0]), y0, int(columns[-1]) + 1, y1))
+    return cards
+
+
+def status_label(text: str):
+    """True for "Completed", False for a progress count, else None (a
+    misread, which must not be learned as either)."""
+    text = text.strip()
+    if text == COMPLETED_TEXT:
+        return True
+    if PROGRESS_PATTERN.fullmatch(text):
+        return False
+    return None
+
+
+def sub_rect(card, box):
+    """`[x_min, x_max, y_min, y_max]` of `box` (fractions) inside `card`."""
+    x0, y0, x1, y1 = card
+    width, height = x1 - x0, y1 - y0
+    return [
+        x0 + int(box[0] * width),
+        x0 + int(box[2] * width),
+        y0 + int(box[1] * height),
+        y0 + int(box[3] * height),
+    ]
+
+
+class BadgeClassifier:
+    """Completed / not completed from the colours of a card's status box.
+
+    Reference histograms are learned from status boxes whose text was read
+    by OCR (`learn`), so no reference images have to ship for every theme
+    and resolution. Until `calibration` completed badges have been seen,
+    and whenever a box does not match one class clearly (by `margin` over
+    the other), `classify` returns None and the caller falls back to OCR.
+    """
+
+    def __init__(
+        self,
+        calibration: int = 8,
+        match_similarity: float = 0.9,
+        max_references: int = 16,
+        margin: float = 0.1,
+    ):
+        self.calibration = calibration
+        self.match_similarity = match_similarity
+        self.max_references = max_references
+        self.margin = margin
+        self.completed = []
+        self.pending = []
+
+    @staticmethod
+    def histogram(crop):
+        if crop.ndim == 2:
+            hist = cv2.calcHist([crop], [0], None, [32], [0, 256])
+        else:
+            hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
+            hist = cv2.calcHist([hsv], [0, 1], None, [30, 32], [0, 180, 0, 256])
+        return cv2.normalize(hist, hist).flatten()
+
+    def learn(self, crop, completed: bool):
+        references = self.completed if completed else self.pending
+        if len(references) < self.max_references:
+            references.append(self.histogram(crop))
+
+    def _similarity(self, hist, references) -> float:
+        return max(
+            (cv2.compareHist(hist, ref, cv2.HISTCMP_CORREL) for ref in references),
+            default=-1.0,
+        )
+
+    def classify(self, crop):
+        """True / False, or None when OCR should decide."""
+        if len(self.completed) < self.calibration:
+            return None
+        hist = self.histogram(crop)
+        completed = self._similarity(hist, self.completed)
+        pending = self._similarity(hist, self.pending)
+        if completed >= self.match_similarity and completed - pending >= self.margin:
+            return True
+        if pending >= self.match_similarity and pending - completed >= self.margin:
+            return False
+        return None
+
+
+class CardLayoutReader:
+    """`readtext` replacement that skips the CRAFT text detector.
+
+    Cards are located with `find_cards` and only the title and status
+    rectangles of each card are passed to the recognizer
+    (`reader.recognize`) in a single call. Results have the `readtext`
+    format, ordered title then status for each card from top to bottom;
+    cards whose title reads empty are left out.
+
+    With a `badge_classifier` the status box is classified from its pixels
+    instead: completed cards only get their title recognized (the status
+    entry is filled in as "Completed") and other cards are skipped.
+    """
+
+    # Read back from OCR pool workers, see `ocr_pool.reader_counters`.
+    COUNTERS = ("badge_counts",)
+
+    def __init__(
+        self,
+        reader,
+        title_box=DEFAULT_TITLE_BOX,
+        status_box=DEFAULT_STATUS_BOX,
+        badge_classifier: BadgeClassifier = None,
+    ):
+        self.reader = reader
+        self.title_box = tuple(title_box)
+        self.status_box = tuple(status_box)
+        self.badges = badge_classifier
+        self.badge_counts = {"completed": 0, "not completed": 0, "ocr": 0}
+
+    def readtext(self, image, batch_size: int = 1, **kwargs):
+        image = load_frame(image)
+        gray = to_gray(image)
+
+        # (title box, status box, badge decision) per card
+        cards = []
+        boxes = []
+        for card in find_cards(gray):
+            title_box = sub_rect(card, self.title_box)
+            status_box = sub_rect(card, self.status_box)
+            completed = None
+            if self.badges is not None:
+                completed = self.badges.classify(_crop(image, status_box))
+            if completed is False:
+                self.badge_counts["not completed"] += 1
+                continue
+            cards.append((title_box, status_box, completed))
+            boxes.append(title_box)
+            if completed is None:
+                boxes.append(status_box)
+                self.badge_counts["ocr"] += 1
+            else:
+                self.badge_counts["completed"] += 1
+        if not boxes:
+            return []
+
+        results = self.reader.recognize(
+            gray,
+            horizontal_list=boxes,
+            free_list=[],
+            batch_size=batch_size,
+            reformat=False,
+            **kwargs,
+        )
+        # The recognizer sorts its crops by position; map them back to boxes.
+        by_corner = {
+            (int(result[0][0][0]), int(result[0][0][1])): result for result in results
+        }
+        ordered = []
+        for title_box, status_box, completed in cards:
+            if completed:
+                status = (_corners(status_box), COMPLETED_TEXT, 1.0)
+            else:
+                status = by_corner.get((status_box[0], status_box[2]))
+                label = None if status is None else status_label(status[1])
+                if label is not None and self.badges is not None:
+                    self.badges.learn(_crop(image, status_box), label)
+            title = by_corner.get((title_box[0], title_box[2]))
+            if title is None or not title[1].strip():
+                continue
+            ordered.append(title)
+            if status is not None:
+                ordered.append(status)
+        return ordered
+
+    def recognize(self, *args, **kwargs):
+        return self.reader.recognize(*args, **kwargs)
+
+    def summary(self) -> str:
+        counts = self.badge_counts
+        return (
+            f"Badges: {counts['completed']} completed and "
+            f"{counts['not completed']} not completed by pixels, "
+            f"{counts['ocr']} read by OCR"
+        )
+
+    def close(self):
+        if hasattr(self.reader, "close"):
+            self.reader.close()
+
+
+def _crop(image, box):
+    x_min, x_max, y_min, y_max = box
+    return image[y_min:y_max, x_min:x_max]
+
+
+def _corners(box):
+    x_min, x_max, y_min, y_max = box
+    return [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]]
+
+
+def layout_from_settings(settings: dict):
+    """`(title_box, status_box, badge_classifier)` when `card_layout` is on,
+    else None. The last item is the `badge_classifier` flag."""
+    if not settings.get("card_layout", False):
+        return None
+    return (
+        tuple(settings.get("card_title_box", DEFAULT_TITLE_BOX)),
+        tuple(settings.get("card_status_box", DEFAULT_STATUS_BOX)),
+        bool(settings.get("badge_classifier", False)),
+    )
+
+
+def layout_reader(reader, layout):
+    """Wrap `reader` for the `layout` from `layout_from_settings`."""
+    if layout is None:
+        return reader
+    title_box, status_box, badge_classifier = layout
+    return CardLayoutReader(
+        reader,
+        title_box,
+        status_box,
+        BadgeClassifier() if badge_classifier else None,
+    )
@@ -0,0 +1,223 @@
+import cv2
+import numpy as np
+
+from pipeline.card_layout import EDGE_MARGIN, MAX_ROW_GAP, find_cards
+from pipeline.frame_writer import load_frame, to_gray
+
+# Frames are compared as strips this many columns wide, row for row.
+STRIP_WIDTH = 128
+# Pixels differing by more than this (0-255) do not line up; smaller
+# differences are video compression noise.
+PIXEL_DIFFERENCE = 40
+# Largest share of misaligned pixels in the overlap for a shift to fit.
+MATCH_SHARE = 0.05
+# The best shift must beat every shift that is not near it by this factor;
+# lists of look-alike cards otherwise match one card further up or down.
+MIN_SHIFT_CONTRAST = 4.0
+# Frames may overlap by as little as this share of a card. Keyframes kept
+# with `scroll_overlap = 0.25` often share less than one card once the
+# panel margins are cut off.
+MIN_OVERLAP_SHARE = 0.08
+MIN_OVERLAP_ROWS = 8
+# Rows kept above and below the new cards when a frame is cropped.
+BAND_PADDING = 6
+
+
+def list_margin(height: int) -> int:
+    """Rows of static margin the panel crop keeps above and below the list."""
+    return max(MAX_ROW_GAP, int(EDGE_MARGIN * height))
+
+
+def row_strip(gray):
+    """`(rows, low, high)` of `gray` squeezed to `STRIP_WIDTH` columns,
+    without the static margin the panel crop keeps above and below the list.
+
+    `low` and `high` are the per-pixel range over the rows above and below,
+    so sub-pixel scroll (and rescaled frames) still line up.
+    """
+    margin = list_margin(gray.shape[0])
+    strip = cv2.resize(gray, (STRIP_WIDTH, gray.shape[0]), interpolation=cv2.INTER_AREA)
+    kernel = np.ones((3, 1), np.uint8)
+    rows = slice(margin, gray.shape[0] - margin)
+    return tuple(
+        image[rows].astype(np.int16)
+        for image in (strip, cv2.erode(strip, kernel), cv2.dilate(strip, kernel))
+    )
+
+
+def shift_limits(cards, height: int):
+    """`(min_overlap, separation)` for `estimate_shift` between frames with
+    these `cards`: a small part of a card, and half a card."""
+    if not cards:
+        return height // 8, height // 20
+    card_height = min(card[3] - card[1] for card in cards)
+    min_overlap = max(MIN_OVERLAP_ROWS, int(MIN_OVERLAP_SHARE * card_height))
+    return min_overlap, card_height // 2
+
+
+def estimate_shift(
+    previous, current, min_overlap: int, separation: int, min_shift: int = None
+):
+    """Scroll between two `row_strip`s, or None if it is not clear.
+
+    Every vertical shift leaving `min_overlap` rows in common is scored by
+    the share of overlapping pixels that disagree; the best one (the larger
+    overlap on ties) must fit (`MATCH_SHARE`) and beat every shift more than
+    `separation` rows away by `MIN_SHIFT_CONTRAST`. Shifts overlapping less
+    than half as many rows as the best one do not count against it: a few
+    rows of blank card match almost anywhere. Positive shifts mean the list
+    moved up (scrolling down): row y of `current` shows row y + shift of
+    `previous`. `min_shift` excludes smaller shifts, e.g. 0 when `previous`
+    is cut from a longer list and rows above it are unknown, not empty.
+    """
+    rows, _, _ = current
+    _, low, high = previous
+    differences = {}
+    overlaps = {}
+    first = min_overlap - len(rows)
+    if min_shift is not None:
+        first = max(first, min_shift)
+    for shift in range(first, len(low) - min_overlap + 1):
+        top = max(0, -shift)
+        bottom = min(len(rows), len(low) - shift)
+        if bottom - top < min_overlap:
+            continue
+        window = rows[top:bottom]
+        differences[shift] = np.mean(
+            (window - high[top + shift : bottom + shift] > PIXEL_DIFFERENCE)
+            | (low[top + shift : bottom + shift] - window > PIXEL_DIFFERENCE)
+        )
+        overlaps[shift] = bottom - top
+    if not differences:
+        return None
+    best = min(differences, key=lambda shift: (differences[shift], -overlaps[shift]))
+    others = [
+        difference
+        for shift, difference in differences.items()
+        if abs(shift - best) > separation and 2 * overlaps[shift] >= overlaps[best]
+    ]
+    if differences[best] > MATCH_SHARE or (
+        others and min(others) <= MIN_SHIFT_CONTRAST * differences[best]
+    ):
+        return None
+
+    def exact_difference(shift):
+        top = max(0, -shift)
+        bottom = min(len(rows), len(low) - shift)
+        return np.abs(
+            rows[top:bottom] - previous[0][top + shift : bottom + shift]
+        ).mean()
+
+    # The one-row slack makes neighbouring shifts tie; pick the exact one.
+    return min(
+        (shift for shift in (best - 1, best, best + 1) if shift in differences),
+        key=exact_difference,
+    )
+
+
+class CardTracker:
+    """Gives every achievement card a stable ID across overlapping frames.
+
+    For each frame the cards are found with `find_cards`, and the scroll
+    displacement to the previous frame is the vertical shift under which
+    the fewest pixels of the overlapping rows disagree. Cards are then placed
+    at `scroll position + y` in list coordinates and matched to known cards
+    there, so cards seen again after scrolling back keep their ID too.
+
+    A wrong match would lose a title, so a shift is only trusted when it is
+    clearly better than any shift a card or more away; otherwise the frame
+    is assumed to show only new cards.
+    """
+
+    def __init__(self):
+        self.position = 0.0
+        self.card_positions = []
+        self.unique_cards = 0
+        self.ocr_cards = 0
+        self.repeated_cards = 0
+        # Top row of the band each cropped frame was cut from.
+        self.band_tops = {}
+        self._previous = None
+
+    def _displacement(self, cards, strip):
+        """Shift of the list since the previous frame, or None if unknown."""
+        prev_cards, prev_strip = self._previous
+        min_overlap, separation = shift_limits(cards + prev_cards, len(strip[0]))
+        return estimate_shift(prev_strip, strip, min_overlap, separation)
+
+    def update(self, gray):
+        """Return `(card, card_id, is_new)` for every card in the frame."""
+        cards = find_cards(gray)
+        strip = row_strip(gray)
+
+        if self._previous is not None and cards:
+            shift = self._displacement(cards, strip)
+            if shift is None:
+                # No overlap with the previous frame: assume a whole frame.
+                shift = gray.shape[0]
+            self.position += shift
+        if cards:
+            self._previous = (cards, strip)
+
+        tracked = []
+        for card in cards:
+            top = self.position + card[1]
+            tolerance = 0.3 * (card[3] - card[1])
+            card_id = next(
+                (
+                    i
+                    for i, known in enumerate(self.card_positions)
+                    if abs(known - top) <= tolerance
+                ),
+                None,
+            )
+            is_new = card_id is None
+            if is_new:
+                card_id = len(self.card_positions)
+                self.card_positions.append(top)
+                self.unique_cards += 1
+            else:
+                self.repeated_cards += 1
+            tracked.append((card, card_id, is_new))
+        return tracked
+
+    def new_card_frames(self, frames):
+        """Filter `(frame_name, image)` pairs down to the cards not seen yet.
+
+        Frames are cropped to the rows spanning their new cards and frames
+        without new cards are dropped. Frames in which no card is found are
+        passed through whole. `to_frame` maps boxes read from a crop back to
+        its frame.
+        """
+        for frame_name, image in frames:
+            image = load_frame(image)
+            gray = to_gray(image)
+            tracked = self.update(gray)
+            if not tracked:
+                yield frame_name, image
+                continue
+
+            new = [card for card, _, is_new in tracked if is_new]
+            if not new:
+                continue
+            self.ocr_cards += len(new)
+            top = max(0, new[0][1] - BAND_PADDING)
+            bottom = min(gray.shape[0], new[-1][3] + BAND_PADDING)
+            self.band_tops[frame_name] = top
+            yield frame_name, image[top:bottom]
+
+    def to_frame(self, frame_name, result):
+        """Shift `readtext` boxes of a cropped frame to frame coordinates."""
+        top = self.band_tops.pop(frame_name, 0)
+        if not top:
+            return result
+        return [
+            ([[x, y + top] for x, y in box], text, confidence)
+            for box, text, confidence in result
+        ]
+
+    def summary(self) -> str:
+        return (
+            f"Cards: {self.unique_cards} unique, {self.ocr_cards} sent to OCR, "
+            f"{self.repeated_cards} duplicate OCR calls avoided"
+        )
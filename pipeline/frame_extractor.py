@@ -1,24 +1,53 @@
 import cv2
+import logging
 import os
 import numpy as np
+import queue
+import threading
 import time
 import toml
 from datetime import datetime
 import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from pipeline.roi_detector import crop_to_roi, detect_panel_roi
+from pipeline.segment_decoder import (
+    MIN_SEGMENT_FRAMES,
+    fetch_frames,
+    measure_segment,
+    split_frame_ranges,
+)
+from pipeline.frame_hash import FrameHashIndex, dhash
+from pipeline.frame_sampler import FrameSampler
+from pipeline.frame_writer import FrameWriter
+from pipeline.keyframe_selector import KeyframeSelector
+from pipeline.progress import ProgressReporter
+from pipeline.step_logger import (
+    NOTICE,
+    get_step_logger,
+    level_from_settings,
+    set_console_level,
+)
 
 STEP_NAME = "frame_extraction"
 TIMESTAMP = datetime.now().strftime("%Y%m%d_%H%M%S")
 LOG_DIR = "logs"
 MAIN_CONFIG_PATH = "config/main_config.toml"
 
+# Marks the end of the decode thread's output queue.
+_END_OF_FRAMES = object()
+# Selected frames handed to one worker per fetch task in segmented mode.
+FETCH_CHUNK_FRAMES = 16
+
 
 def ensure_directory_exists(path):
     if path and not os.path.exists(path):
         os.makedirs(path, exist_ok=True)
 
 
-ensure_directory_exists(LOG_DIR)
 LOG_FILE = os.path.join(LOG_DIR, f"{STEP_NAME}_{TIMESTAMP}.log")
+logger = get_step_logger(STEP_NAME, LOG_FILE)
 
 
 def load_main_config(main_config_path: str) -> dict:
@@ -30,19 +59,41 @@ def load_main_config(main_config_path: str) -> dict:
 def load_step_config(step_config_path: str, main_config_path: str) -> dict:
     if not os.path.exists(step_config_path):
         create_default_config(step_config_path)
-    return toml.load(step_config_path)
+    config = toml.load(step_config_path)
+    set_console_level(logger, level_from_settings(config.get("settings", {})))
+    return config
 
 
 def create_default_config(config_path: str):
     default_config = {
         "video": {"path": "sample.mp4"},
-        "output": {"folder": f"data/frames/{STEP_NAME}_{TIMESTAMP}"},
+        "output": {
+            "folder": f"data/frames/{STEP_NAME}_{TIMESTAMP}",
+            "format": "png",
+            "png_compression": 3,
+            "quality": 95,
+            "grayscale": False,
+            "writer_threads": 4,
+            "store_capacity": 256,
+        },
         "settings": {
             "diff_threshold": 10_000_000,
             "save_first_frame": True,
-            "verbose": True,
-            "log_skipped_frames": False,
+            "log_level": "INFO",
             "save_gray_diff_map": False,
+            "debug_save_frames": False,
+            "auto_roi": True,
+            "roi_probe_frames": 30,
+            "selection_mode": "scroll",
+            "scroll_overlap": 0.25,
+            "min_scroll_response": 0.3,
+            "decode_queue_size": 32,
+            "segment_workers": 0,
+            "adaptive_stride": False,
+            "max_frame_stride": 8,
+            "stride_target_shift": 0.1,
+            "dedup_frames": True,
+            "dedup_max_distance": 12,
         },
     }
     ensure_directory_exists(os.path.dirname(config_path))
@@ -58,36 +109,55 @@ def format_time(seconds):
     return f"{hours:02}:{minutes:02}:{secs:02}"
 
 
-def log(message: str, enabled: bool = True):
-    if enabled:
-        print(message)
-    with open(LOG_FILE, "a") as f:
-        f.write(message + "\n")
+def log(message: str, level: int = NOTICE):
+    logger.log(level, message)
 
 
 def print_summary(
-    frame_num: int, saved_frame_num: int, start_time: float, end_time: float
+    frame_num: int,
+    saved_frame_num: int,
+    start_time: float,
+    end_time: float,
+    extra_lines=None,
 ):
+    extra = "".join(f"{line}\n" for line in extra_lines or [])
     summary = (
         "\n=== Summary ===\n"
         f"Total frames scanned: {frame_num}\n"
         f"Unique frames saved: {saved_frame_num}\n"
+        f"{extra}"
         f"Total time: {format_time(end_time - start_time)}\n"
         "================"
     )
     log(summary)
 
 
-def extract_unique_frames(
+def iter_unique_frames(
     video_path: str,
-    output_folder: str,
     diff_threshold: float,
     save_first_frame: bool = True,
-    verbose: bool = True,
-    log_skipped_frames: bool = False,
-    save_gray_diff_map: bool = False,
+    with_diff: bool = False,
+    auto_roi: bool = True,
+    roi=None,
+    roi_probe_frames: int = 30,
+    selection_mode: str = "scroll",
+    scroll_overlap: float = 0.25,
+    min_scroll_response: float = 0.3,
+    decode_queue_size: int = 32,
+    segment_workers: int = 0,
+    adaptive_stride: bool = False,
+    max_frame_stride: int = 8,
+    stride_target_shift: float = 0.1,
+    dedup_frames: bool = True,
+    dedup_max_distance: int = 12,
 ):
-    ensure_directory_exists(output_folder)
+    """Yield `(frame_num, frame)` (plus the diff map with `with_diff`) for
+    every kept frame; see `roi_detector`, `keyframe_selector`,
+    `frame_sampler`, `frame_hash` and `_iter_segmented_frames` for the options.
+    """
+    selector = KeyframeSelector(
+        diff_threshold, selection_mode, scroll_overlap, min_scroll_response
+    )
 
     if not os.path.exists(video_path):
         raise FileNotFoundError(f"Video file not found: {video_path}")
@@ -99,75 +169,469 @@ def extract_unique_frames(
     fps = cap.get(cv2.CAP_PROP_FPS)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
-    log(f"Video: {video_path}", verbose)
-    log(f"Total frames: {total_frames}", verbose)
-    log(f"FPS: {fps:.2f}", verbose)
+    log(f"Video: {video_path}", logging.INFO)
+    log(f"Total frames: {total_frames}", logging.INFO)
+    log(f"FPS: {fps:.2f}", logging.INFO)
+
+    if roi is None and auto_roi:
+        roi = detect_panel_roi(cap, roi_probe_frames)
+        if roi is None:
+            log("ROI: panel fills the frame, no cropping.", logging.INFO)
+    if roi is not None:
+        roi = tuple(int(v) for v in roi)
+        log(f"ROI: x={roi[0]} y={roi[1]} w={roi[2]} h={roi[3]}", logging.INFO)
+
+    if segment_workers > 1 and total_frames >= 2 * MIN_SEGMENT_FRAMES:
+        cap.release()
+        yield from _iter_segmented_frames(
+            video_path,
+            roi,
+            total_frames,
+            selector,
+            segment_workers,
+            save_first_frame=save_first_frame,
+            with_diff=with_diff,
+            frame_index=(FrameHashIndex(dedup_max_distance) if dedup_frames else None),
+        )
+        return
 
     frame_num = 0
+    scanned_frames = 0
     saved_frame_num = 0
     prev_gray = None
+    pending = None
 
     start_time = time.time()
+    reporter = ProgressReporter(log, "frames", total_frames)
 
-    logged_steps = set()
+    frame_index = FrameHashIndex(dedup_max_distance) if dedup_frames else None
+    sampler = FrameSampler(adaptive_stride, max_frame_stride, stride_target_shift)
+    if adaptive_stride:
+        selector.track_scroll = True
+    prev_frame_num = 0
 
-    while cap.isOpened():
-        try:
-            ret, frame = cap.read()
-            if not ret:
-                break
+    frames = _read_frames(cap, roi, sampler, total_frames)
+    # The adaptive stride is set by the frames already looked at; a decode
+    # thread running ahead would sample with a stale stride.
+    if decode_queue_size > 0 and not adaptive_stride:
+        frames = _threaded_frames(frames, decode_queue_size)
 
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    try:
+        for frame_num, frame, gray in frames:
+            scanned_frames = frame_num + 1
+            try:
+                selected = None
+
+                if prev_gray is None and save_first_frame:
+                    selected = (frame_num, frame, None)
+                    detail = None
+                elif prev_gray is not None:
+                    diff, diff_score, offset, response = selector.measure(
+                        prev_gray, gray
+                    )
+                    keep, detail = selector.decide(
+                        diff_score, offset, response, gray.shape[0]
+                    )
+                    sampler.update(
+                        offset,
+                        frame_num - prev_frame_num,
+                        gray.shape[0],
+                        reliable=response >= min_scroll_response,
+                    )
+
+                    if keep:
+                        selected = (frame_num, frame, diff)
+                        pending = None
+                    else:
+                        log(f"[{frame_num}] Skipped — {detail}", logging.DEBUG)
+                        pending = (frame_num, frame, diff)
+
+                if selected is not None and _is_duplicate(
+                    frame_index, gray, frame_num, saved_frame_num
+                ):
+                    selected = None
+                elif selected is not None and detail is None:
+                    log(f"[{saved_frame_num}] Saved first frame.", logging.INFO)
+                elif selected is not None:
+                    log(f"[{saved_frame_num}] Saved frame — {detail}", logging.INFO)
 
-            if prev_gray is None and save_first_frame:
-                output_path = os.path.join(
-                    output_folder, f"frame_{saved_frame_num:04}.png"
-                )
-                cv2.imwrite(output_path, frame)
-                log(f"[{saved_frame_num}] Saved first frame.", verbose)
+                prev_gray = gray
+                prev_frame_num = frame_num
+
+                reporter.update(scanned_frames - reporter.done)
+
+            except Exception as e:
+                log(f"[Error] Frame {frame_num}: {e}", logging.ERROR)
+                continue
+
+            if selected is not None:
                 saved_frame_num += 1
-            elif prev_gray is not None:
-                diff = cv2.absdiff(prev_gray, gray)
-                diff_score = np.sum(diff)
+                yield selected if with_diff else selected[:2]
+
+        # The tail of the list after the last keyframe has not been seen yet.
+        if (
+            pending is not None
+            and selector.has_unseen_tail()
+            and not _is_duplicate(
+                frame_index,
+                cv2.cvtColor(pending[1], cv2.COLOR_BGR2GRAY),
+                pending[0],
+                saved_frame_num,
+            )
+        ):
+            log(f"[{saved_frame_num}] Saved last frame.", logging.INFO)
+            saved_frame_num += 1
+            yield pending if with_diff else pending[:2]
+    finally:
+        frames.close()
+        cap.release()
+        end_time = time.time()
+        reporter.finish()
+        extra_lines = [reporter.summary()]
+        if adaptive_stride:
+            extra_lines.append(f"Frames decoded: {sampler.decoded}")
+        if frame_index is not None:
+            extra_lines.append(frame_index.summary())
+        print_summary(
+            max(scanned_frames, sampler.scanned),
+            saved_frame_num,
+            start_time,
+            end_time,
+            extra_lines,
+        )
 
-                if diff_score > diff_threshold:
-                    output_path = os.path.join(
-                        output_folder, f"frame_{saved_frame_num:04}.png"
-                    )
-                    cv2.imwrite(output_path, frame)
-                    log(
-                        f"[{saved_frame_num}] Saved frame — diff: {diff_score}", verbose
-                    )
-                    if save_gray_diff_map:
-                        diff_map_path = os.path.join(
-                            output_folder, f"diff_{saved_frame_num:04}.png"
-                        )
-                        cv2.imwrite(diff_map_path, diff)
-                    saved_frame_num += 1
+
+def _is_duplicate(
+    frame_index: FrameHashIndex,
+    gray,
+    frame_num: int,
+    saved_frame_num: int,
+) -> bool:
+    """Check a frame about to be kept against all kept frames.
+
+    Unique frames are added to the index under their `saved_frame_num`.
+    """
+    if frame_index is None:
+        return False
+    frame_hash = dhash(gray)
+    duplicate = frame_index.find(frame_hash)
+    if duplicate is not None:
+        log(f"[{frame_num}] Skipped — duplicate of frame_{duplicate:04}", logging.DEBUG)
+        return True
+    frame_index.add(frame_hash, saved_frame_num)
+    return False
+
+
+def _iter_segmented_frames(
+    video_path: str,
+    roi,
+    total_frames: int,
+    selector: KeyframeSelector,
+    segment_workers: int,
+    save_first_frame: bool = True,
+    with_diff: bool = False,
+    frame_index: FrameHashIndex = None,
+):
+    """Multi-process variant of the `iter_unique_frames` loop.
+
+    1. Worker processes each decode one frame range (seeking with
+       `CAP_PROP_POS_FRAMES`, one frame of overlap) and measure every frame
+       against its predecessor.
+    2. The measurements are stitched in frame order and run through the same
+       `KeyframeSelector` as the serial loop, so the selection and the
+       `frame_XXXX` numbering match a serial run.
+    3. The selected frames are decoded again by the workers in ordered chunks
+       and checked against `frame_index`, if given.
+    """
+    start_time = time.time()
+    scanned_frames = 0
+    saved_frame_num = 0
+    ranges = split_frame_ranges(total_frames, segment_workers * 2)
+    reporter = ProgressReporter(log, "frames", total_frames)
+    log(
+        f"Decoding {len(ranges)} segments on {segment_workers} processes.",
+        logging.INFO,
+    )
+
+    pool = ProcessPoolExecutor(max_workers=segment_workers)
+    try:
+        futures = [
+            pool.submit(
+                measure_segment, video_path, roi, start, end, selector.selection_mode
+            )
+            for start, end in ranges
+        ]
+
+        selected = []
+        pending = None
+        for num, future in enumerate(futures):
+            for frame_num, diff_score, offset, response, height in future.result():
+                scanned_frames = frame_num + 1
+                if diff_score is None:
+                    if save_first_frame:
+                        log(f"[{len(selected)}] Saved first frame.", logging.INFO)
+                        selected.append(frame_num)
+                    continue
+
+                keep, detail = selector.decide(diff_score, offset, response, height)
+                if keep:
+                    log(f"[{len(selected)}] Saved frame — {detail}", logging.INFO)
+                    selected.append(frame_num)
+                    pending = None
                 else:
-                    log(
-                        f"[{frame_num}] Skipped — diff: {diff_score}",
-                        log_skipped_frames,
-                    )
+                    log(f"[{frame_num}] Skipped — {detail}", logging.DEBUG)
+                    pending = frame_num
+            reporter.update(scanned_frames - reporter.done)
+
+        if pending is not None and selector.has_unseen_tail():
+            log(f"[{len(selected)}] Saved last frame.", logging.INFO)
+            selected.append(pending)
+
+        chunks = [
+            selected[i : i + FETCH_CHUNK_FRAMES]
+            for i in range(0, len(selected), FETCH_CHUNK_FRAMES)
+        ]
+        fetches = deque()
+
+        def drain(future):
+            nonlocal saved_frame_num
+            for item in future.result():
+                gray = cv2.cvtColor(item[1], cv2.COLOR_BGR2GRAY)
+                if _is_duplicate(frame_index, gray, item[0], saved_frame_num):
+                    continue
+                saved_frame_num += 1
+                yield item if with_diff else item[:2]
+
+        for chunk in chunks:
+            fetches.append(pool.submit(fetch_frames, video_path, roi, chunk, with_diff))
+            # Keep a few chunks in flight without buffering the whole video.
+            while len(fetches) > segment_workers * 2:
+                yield from drain(fetches.popleft())
+        while fetches:
+            yield from drain(fetches.popleft())
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        reporter.finish()
+        extra_lines = [reporter.summary()]
+        if frame_index is not None:
+            extra_lines.append(frame_index.summary())
+        print_summary(
+            scanned_frames, saved_frame_num, start_time, time.time(), extra_lines
+        )
 
-            prev_gray = gray
-            frame_num += 1
 
-            progress = int((frame_num / total_frames) * 100)
-            step = (progress // 10) * 10
-            if step not in logged_steps:
-                log(f"Progress: {progress}% | {frame_num} / {total_frames}")
-                logged_steps.add(step)
+def _read_frames(cap, roi, sampler: FrameSampler = None, total_frames: int = 0):
+    """Yield `(frame_num, frame, gray)` with frames cropped to `roi`.
 
+    With an adaptive `sampler`, frames between samples are only grabbed. The
+    last frame is always retrieved so the end of the list is not missed.
+    """
+    sampler = sampler or FrameSampler()
+    frame_num = 0
+    next_frame_num = 0
+    while cap.isOpened():
+        if sampler.adaptive:
+            if not cap.grab():
+                break
+            sampler.scanned += 1
+            if frame_num < next_frame_num and frame_num < total_frames - 1:
+                frame_num += 1
+                continue
+            ret, frame = cap.retrieve()
+        else:
+            ret, frame = cap.read()
+            if ret:
+                sampler.scanned += 1
+        if not ret:
+            break
+        sampler.decoded += 1
+        try:
+            frame = crop_to_roi(frame, roi)
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         except Exception as e:
-            log(f"[Error] Frame {frame_num}: {e}", True)
-            frame_num += 1
-            continue
+            log(f"[Error] Frame {frame_num}: {e}", logging.ERROR)
+        else:
+            yield frame_num, frame, gray
+        next_frame_num = frame_num + sampler.stride
+        frame_num += 1
+
+
+def _threaded_frames(frames, queue_size: int):
+    """Run the `frames` generator on a decode thread behind a bounded queue.
+
+    OpenCV releases the GIL while decoding and converting, so the caller's
+    diff/select work overlaps with decoding the next frames.
+    """
+    buffer = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in frames:
+                if not put(item):
+                    break
+        except Exception as e:
+            put(e)
+        finally:
+            frames.close()
+            put(_END_OF_FRAMES)
+
+    thread = threading.Thread(target=produce, name="frame-decoder", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END_OF_FRAMES:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def extract_unique_frames(
+    video_path: str,
+    output_folder: str,
+    diff_threshold: float,
+    save_first_frame: bool = True,
+    save_gray_diff_map: bool = False,
+    writer=None,
+    **selection_options,
+):
+    """Write the frames selected by `iter_unique_frames` to `output_folder`.
+
+    Encoding is done by `writer` (PNG on 4 threads by default) so it overlaps
+    with decoding; a `FrameStore` puts all frames into one memory-mapped file
+    instead, indexed by frame number, timestamp and diff score.
+    `selection_options` are forwarded to `iter_unique_frames` (ROI, keyframe
+    selection and decode settings).
+    """
+    ensure_directory_exists(output_folder)
+    if writer is None:
+        writer = FrameWriter(output_folder)
+    diff_writer = writer if isinstance(writer, FrameWriter) else None
+    fps = _video_fps(video_path)
+
+    frames = iter_unique_frames(
+        video_path,
+        diff_threshold,
+        save_first_frame=save_first_frame,
+        with_diff=True,
+        **selection_options,
+    )
+    try:
+        for saved_frame_num, (frame_num, frame, diff) in enumerate(frames):
+            writer.write(
+                f"frame_{saved_frame_num:04}",
+                frame,
+                frame_num=frame_num,
+                timestamp=round(frame_num / fps, 3) if fps else None,
+                diff_score=int(np.sum(diff)) if diff is not None else None,
+            )
+            if save_gray_diff_map and diff is not None:
+                # The frame store holds fixed-size frames only; diff maps
+                # still go to PNG files next to it.
+                if diff_writer is None:
+                    diff_writer = FrameWriter(output_folder, replace_store=False)
+                diff_writer.write(f"diff_{saved_frame_num:04}", diff)
+    finally:
+        writer.close()
+        if diff_writer is not None and diff_writer is not writer:
+            diff_writer.close()
+    log(writer.summary(), logging.INFO)
+
+
+def _video_fps(video_path: str) -> float:
+    cap = cv2.VideoCapture(video_path)
+    try:
+        return cap.get(cv2.CAP_PROP_FPS) if cap.isOpened() else 0.0
+    finally:
+        cap.release()
+
+
+def selection_options_from_settings(settings: dict) -> dict:
+    """Map `[settings]` keys to the ROI/selection kwargs of `iter_unique_frames`."""
+    return {
+        "auto_roi": settings.get("auto_roi", True),
+        "roi": settings.get("roi"),
+        "roi_probe_frames": settings.get("roi_probe_frames", 30),
+        "selection_mode": settings.get("selection_mode", "scroll"),
+        "scroll_overlap": settings.get("scroll_overlap", 0.25),
+        "min_scroll_response": settings.get("min_scroll_response", 0.3),
+        "decode_queue_size": settings.get("decode_queue_size", 32),
+        "segment_workers": settings.get("segment_workers", 0),
+        "adaptive_stride": settings.get("adaptive_stride", False),
+        "max_frame_stride": settings.get("max_frame_stride", 8),
+        "stride_target_shift": settings.get("stride_target_shift", 0.1),
+        "dedup_frames": settings.get("dedup_frames", True),
+        "dedup_max_distance": settings.get("dedup_max_distance", 12),
+    }
+
+
+def stream_frames_from_config(main_config_path: str):
+    """Return a generator of `(frame_name, frame)` for the OCR step.
+
+    The step config is loaded (and created if missing) eagerly so the OCR
+    config can be derived from it before the first frame is decoded. Frames
+    are only written to the output folder when `debug_save_frames` is
+    enabled, using the same `frame_XXXX` names and `[output]` format as the
+    disk-based flow.
+    """
+    main_config = load_main_config(main_config_path)
+    step_config_path = main_config["steps"].get(STEP_NAME)
+    config = load_step_config(step_config_path, main_config_path)
+    settings = config["settings"]
+
+    debug_save_frames = settings.get("debug_save_frames", False)
+    output_folder = (
+        config["output"].get("folder") or f"data/frame/{STEP_NAME}_{TIMESTAMP}"
+    )
+    writer = None
+    if debug_save_frames:
+        ensure_directory_exists(output_folder)
+        writer = FrameWriter.from_config(
+            _output_config(config), output_folder=output_folder
+        )
+
+    frames = iter_unique_frames(
+        video_path=config["video"]["path"],
+        diff_threshold=settings["diff_threshold"],
+        save_first_frame=settings.get("save_first_frame", True),
+        **selection_options_from_settings(settings),
+    )
+    return _named_frames(frames, writer)
+
+
+def _named_frames(frames, writer=None):
+    try:
+        for saved_frame_num, (_, frame) in enumerate(frames):
+            frame_name = f"frame_{saved_frame_num:04}"
+            if writer is not None:
+                writer.write(frame_name, frame)
+            yield frame_name, frame
+    finally:
+        if writer is not None:
+            writer.close()
+            log(writer.summary())
 
-    cap.release()
-    end_time = time.time()
 
-    print_summary(frame_num, saved_frame_num, start_time, end_time)
+def _output_config(config: dict) -> dict:
+    """`[output]` section, accepting `writer_threads` from `[settings]` too."""
+    output_config = dict(config.get("output", {}))
+    if "writer_threads" not in output_config:
+        output_config["writer_threads"] = config["settings"].get("writer_threads", 4)
+    return output_config
 
 
 def run_from_config(main_config_path: str):
@@ -186,12 +650,14 @@ def run_from_config(main_config_path: str):
             output_folder=output_folder,
             diff_threshold=config["settings"]["diff_threshold"],
             save_first_frame=config["settings"].get("save_first_frame", True),
-            verbose=config["settings"].get("verbose", True),
-            log_skipped_frames=config["settings"].get("log_skipped_frames", False),
             save_gray_diff_map=config["settings"].get("save_gray_diff_map", False),
+            writer=FrameWriter.from_config(
+                _output_config(config), output_folder=output_folder
+            ),
+            **selection_options_from_settings(config["settings"]),
         )
     except Exception as e:
-        log(f"[Fatal Error] {e}", True)
+        log(f"[Fatal Error] {e}", logging.ERROR)
         sys.exit(1)
 
 
@@ -0,0 +1,83 @@
+import time
+
+from pipeline.card_layout import (
+    DEFAULT_STATUS_BOX,
+    BadgeClassifier,
+    find_cards,
+    status_label,
+    sub_rect,
+)
+from pipeline.frame_writer import load_frame, to_gray
+
+
+class CompletedFrameGate:
+    """Drops frames in which no card shows a completed badge, before OCR.
+
+    Runs of not-yet-completed achievements cost a full `readtext` per frame
+    but yield no titles. Each frame's cards are found with `find_cards` and
+    their status boxes are matched against colour histograms of completed
+    and not-completed badges (`BadgeClassifier`); a frame is skipped only
+    when every card is clearly not completed. The references are learned
+    from the OCR results of the frames that were read (`learn`), so until
+    enough badges have been seen no frame is skipped.
+    """
+
+    def __init__(self, status_box=DEFAULT_STATUS_BOX):
+        self.status_box = tuple(status_box)
+        self.badges = BadgeClassifier()
+        self.frames = 0
+        self.skipped = 0
+        self.read = 0
+        self.ocr_seconds = 0.0
+        self.gate_seconds = 0.0
+        # Status boxes of passed frames, until their OCR result comes back.
+        self._pending = {}
+
+    def filter(self, frames):
+        """Yield the `(frame_name, image)` pairs that may hold completed cards."""
+        for frame_name, image in frames:
+            start = time.perf_counter()
+            image = load_frame(image)
+            gray = to_gray(image)
+            cards = []
+            for card in find_cards(gray):
+                x_min, x_max, y_min, y_max = sub_rect(card, self.status_box)
+                cards.append((card, image[y_min:y_max, x_min:x_max]))
+            decisions = [self.badges.classify(crop) for _, crop in cards]
+            self.gate_seconds += time.perf_counter() - start
+            self.frames += 1
+
+            if cards and all(decision is False for decision in decisions):
+                self.skipped += 1
+                continue
+            self._pending[frame_name] = cards
+            yield frame_name, image
+
+    def learn(self, frame_name, result, seconds: float):
+        """Learn the badges of a passed frame from its `readtext` result.
+
+        A card is completed if a "Completed" line lies inside it and not
+        completed if a progress count ("3/10") does; cards with neither
+        (misreads) are not learned (see `card_layout.status_label`).
+        """
+        self.read += 1
+        self.ocr_seconds += seconds
+        for card, crop in self._pending.pop(frame_name, []):
+            x0, y0, x1, y1 = card
+            labels = set()
+            for box, text, _ in result:
+                x = sum(point[0] for point in box) / len(box)
+                y = sum(point[1] for point in box) / len(box)
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    labels.add(status_label(text))
+            labels.discard(None)
+            if len(labels) == 1 and crop.size:
+                self.badges.learn(crop, labels.pop())
+
+    def summary(self) -> str:
+        saved = self.skipped * self.ocr_seconds / self.read if self.read else 0.0
+        return (
+            f"Frame gate: {self.skipped} of {self.frames} frames skipped without "
+            f"a completed badge, ~{saved:.1f}s of OCR saved "
+            f"(gate took {self.gate_seconds:.1f}s)"
+        )
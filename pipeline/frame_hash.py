@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+
+# A wide, short difference hash: each row averages a horizontal band of the
+# panel, so two different cards at the same scroll alignment still differ in
+# their text columns, while re-encoded copies of the same view hash alike.
+HASH_ROWS = 16
+HASH_COLS = 64
+
+
+def dhash(gray, rows: int = HASH_ROWS, cols: int = HASH_COLS):
+    """Difference hash of a gray frame, packed into `rows * cols / 8` bytes."""
+    small = cv2.resize(gray, (cols + 1, rows), interpolation=cv2.INTER_AREA)
+    return np.packbits(small[:, 1:] > small[:, :-1])
+
+
+class FrameHashIndex:
+    """In-memory index of kept-frame hashes with Hamming-distance lookup."""
+
+    def __init__(self, max_distance: int = 12):
+        self.max_distance = max_distance
+        self._hashes = None
+        self._keys = []
+        self.lookups = 0
+        self.hits = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def find(self, frame_hash):
+        """Key of the closest indexed frame within `max_distance`, else None."""
+        self.lookups += 1
+        if not self._keys:
+            return None
+        stored = self._hashes[: len(self._keys)]
+        distances = np.unpackbits(stored ^ frame_hash, axis=1).sum(axis=1)
+        best = int(np.argmin(distances))
+        if distances[best] > self.max_distance:
+            return None
+        self.hits += 1
+        return self._keys[best]
+
+    def add(self, frame_hash, key):
+        count = len(self._keys)
+        if self._hashes is None:
+            self._hashes = np.empty((64, frame_hash.size), dtype=np.uint8)
+        elif count == len(self._hashes):
+            self._hashes = np.concatenate([self._hashes, np.empty_like(self._hashes)])
+        self._hashes[count] = frame_hash
+        self._keys.append(key)
+
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"Duplicate frames dropped: {self.hits} / {self.lookups} checked "
+            f"({self.hit_rate():.1%})"
+        )
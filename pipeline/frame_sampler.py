@@ -0,0 +1,37 @@
+class FrameSampler:
+    """Decides which frames are retrieved when reading with `cap.grab()`.
+
+    Frames between samples are only grabbed (demuxed) and never converted,
+    cropped or diffed. With `adaptive` the stride follows the measured scroll
+    speed: it shrinks so that one step moves at most `target_shift` of the
+    panel height, and doubles while the view is static, up to `max_stride`.
+
+    The reader thread reads `stride` while the selection stage calls
+    `update`; a plain int attribute keeps that safe without a lock.
+    """
+
+    def __init__(
+        self, adaptive: bool = False, max_stride: int = 8, target_shift: float = 0.1
+    ):
+        self.adaptive = adaptive
+        self.max_stride = max(1, int(max_stride))
+        self.target_shift = target_shift
+        self.stride = 1
+        self.scanned = 0
+        self.decoded = 0
+
+    def update(self, offset: float, gap: int, height: int, reliable: bool = True):
+        """Adapt the stride after measuring `offset` pixels over `gap` frames."""
+        if not self.adaptive:
+            return
+        if not reliable:
+            # Lost track of the scroll: sample every frame until it is back.
+            self.stride = 1
+            return
+
+        speed = abs(offset) / max(gap, 1)
+        if speed < 0.5:
+            self.stride = min(self.max_stride, self.stride * 2)
+        else:
+            stride = int(self.target_shift * height / speed)
+            self.stride = max(1, min(self.max_stride, stride))
@@ -0,0 +1,147 @@
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+STORE_DATA_FILE = "frames.store"
+STORE_INDEX_FILE = "frames.store.json"
+# Frame files `FrameWriter` leaves in a folder, replaced by a store.
+IMAGE_FRAME_PREFIX = "frame_"
+IMAGE_FRAME_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".npy")
+
+
+class FrameStore:
+    """All frames of one run in a single memory-mapped array.
+
+    Frames are fixed-size ROI crops, so the store is one preallocated file of
+    `capacity * height * width * channels` bytes plus a small JSON index with
+    the frame name, video frame number, timestamp and diff score of every
+    slot. The file grows by doubling if the capacity estimate was too low and
+    is trimmed to the used size on `close`.
+
+    Open an existing store with `FrameStore.open(folder)`; `frames[i]` is then
+    a read-only view into the mapped file (no decode, no copy).
+    """
+
+    def __init__(self, folder: str, capacity: int = 256, grayscale: bool = False):
+        self.folder = folder
+        self.capacity = max(1, int(capacity))
+        self.grayscale = grayscale
+        self.data_path = os.path.join(folder, STORE_DATA_FILE)
+        self.index_path = os.path.join(folder, STORE_INDEX_FILE)
+        self.frames = None
+        self.shape = None
+        self.entries = []
+        self.bytes_written = 0
+        self.encode_seconds = 0.0
+
+    @classmethod
+    def open(cls, folder: str):
+        """Open a finished store for reading."""
+        with open(os.path.join(folder, STORE_INDEX_FILE), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        store = cls(folder)
+        store.shape = tuple(index["shape"])
+        store.entries = index["frames"]
+        if store.entries:
+            store.frames = np.memmap(
+                store.data_path,
+                dtype=np.uint8,
+                mode="r",
+                shape=(len(store.entries),) + store.shape,
+            )
+        return store
+
+    @staticmethod
+    def exists(folder: str) -> bool:
+        return os.path.exists(os.path.join(folder, STORE_INDEX_FILE))
+
+    @staticmethod
+    def remove(folder: str):
+        """Delete the store in `folder`, if any (OCR would prefer it)."""
+        for name in (STORE_INDEX_FILE, STORE_DATA_FILE):
+            path = os.path.join(folder, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _remove_image_frames(self):
+        # Frame files of an earlier run would otherwise mix with this one.
+        for name in os.listdir(self.folder):
+            if name.startswith(IMAGE_FRAME_PREFIX) and name.lower().endswith(
+                IMAGE_FRAME_EXTENSIONS
+            ):
+                os.remove(os.path.join(self.folder, name))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        """Yield `(name, frame)` in the order the frames were written."""
+        for slot, entry in enumerate(self.entries):
+            yield entry["name"], self.frames[slot]
+
+    def _map(self, capacity: int):
+        if self.frames is not None:
+            self.frames.flush()
+            del self.frames
+        size = capacity * int(np.prod(self.shape))
+        with open(self.data_path, "ab") as f:
+            f.truncate(size)
+        self.frames = np.memmap(
+            self.data_path, dtype=np.uint8, mode="r+", shape=(capacity,) + self.shape
+        )
+        self.capacity = capacity
+
+    def write(self, name: str, image, frame_num: int = None, **metadata):
+        """Copy `image` into the next slot and record its index entry."""
+        start = time.perf_counter()
+        if self.grayscale and image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        if self.shape is None:
+            os.makedirs(self.folder, exist_ok=True)
+            FrameStore.remove(self.folder)
+            self._remove_image_frames()
+            self.shape = image.shape
+            self._map(self.capacity)
+        elif image.shape != self.shape:
+            raise ValueError(
+                f"Frame {name} has shape {image.shape}, store holds {self.shape}"
+            )
+
+        slot = len(self.entries)
+        if slot == self.capacity:
+            self._map(self.capacity * 2)
+        self.frames[slot] = image
+        self.entries.append({"name": name, "frame_num": frame_num, **metadata})
+
+        self.bytes_written += image.nbytes
+        self.encode_seconds += time.perf_counter() - start
+        return self.data_path
+
+    def close(self):
+        """Flush, trim the data file to the used slots and write the index."""
+        if self.frames is not None:
+            self.frames.flush()
+            del self.frames
+            self.frames = None
+            with open(self.data_path, "ab") as f:
+                f.truncate(len(self.entries) * int(np.prod(self.shape)))
+
+        os.makedirs(self.folder, exist_ok=True)
+        index = {
+            "shape": list(self.shape or ()),
+            "dtype": "uint8",
+            "frames": self.entries,
+        }
+        with open(self.index_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1)
+
+    def summary(self) -> str:
+        return (
+            f"Frames stored: {len(self.entries)} "
+            f"({self.bytes_written / 1_000_000:.1f} MB, memory-mapped store) "
+            f"| Copy time: {self.encode_seconds:.2f}s"
+        )
@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from pipeline.frame_store import FrameStore
+
+IMAGE_FORMATS = ("png", "jpg", "webp", "npy")
+# `[output] format` value that selects `FrameStore` instead of image files.
+STORE_FORMAT = "store"
+
+
+class FrameWriter:
+    """Encodes frames to `output_folder` on a pool of writer threads.
+
+    `image_format` is one of `IMAGE_FORMATS`: PNG uses `png_compression`
+    (0-9, lower is faster and larger), JPEG/WebP use `quality` (0-100) and
+    `npy` stores the raw array with no encoding at all. With `grayscale` the
+    frame is converted before encoding, a third of the bytes for OCR input.
+    `threads = 0` writes inline. Unless `replace_store` is off, the first
+    write deletes a `FrameStore` left in the folder by an earlier run, which
+    OCR would otherwise read instead of these files.
+    """
+
+    def __init__(
+        self,
+        output_folder: str,
+        image_format: str = "png",
+        png_compression: int = 3,
+        quality: int = 95,
+        grayscale: bool = False,
+        threads: int = 4,
+        replace_store: bool = True,
+    ):
+        image_format = image_format.lower().lstrip(".")
+        if image_format == "jpeg":
+            image_format = "jpg"
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown image format: {image_format}")
+
+        self.output_folder = output_folder
+        self.image_format = image_format
+        self.grayscale = grayscale
+        self.threads = threads
+        self.replace_store = replace_store
+        if image_format == "png":
+            self.params = [cv2.IMWRITE_PNG_COMPRESSION, int(png_compression)]
+        elif image_format == "jpg":
+            self.params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+        elif image_format == "webp":
+            self.params = [cv2.IMWRITE_WEBP_QUALITY, int(quality)]
+        else:
+            self.params = []
+
+        self.bytes_written = 0
+        self.encode_seconds = 0.0
+        self.frames_written = 0
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._pool = ThreadPoolExecutor(max_workers=threads) if threads > 0 else None
+
+    @classmethod
+    def from_config(cls, output_config: dict, output_folder: str = None):
+        """Build a writer from the `[output]` section of `frame_extraction.toml`.
+
+        Returns a `FrameStore` when `format = "store"`.
+        """
+        output_folder = output_folder or output_config["folder"]
+        if output_config.get("format", "png") == STORE_FORMAT:
+            return FrameStore(
+                output_folder,
+                capacity=output_config.get("store_capacity", 256),
+                grayscale=output_config.get("grayscale", False),
+            )
+        return cls(
+            output_folder,
+            image_format=output_config.get("format", "png"),
+            png_compression=output_config.get("png_compression", 3),
+            quality=output_config.get("quality", 95),
+            grayscale=output_config.get("grayscale", False),
+            threads=output_config.get("writer_threads", 4),
+        )
+
+    def path_for(self, name: str) -> str:
+        return os.path.join(self.output_folder, f"{name}.{self.image_format}")
+
+    def write(self, name: str, image, **metadata):
+        """Queue `image` to be written as `<name>.<format>`.
+
+        Blocks once a few frames per thread are waiting, so a slow disk
+        cannot make the caller buffer the whole video. `metadata` (frame
+        number, diff score, ...) is only kept by `FrameStore`.
+        """
+        grayscale = self.grayscale
+        path = self.path_for(name)
+        if self.replace_store:
+            self.replace_store = False
+            FrameStore.remove(self.output_folder)
+        if self._pool is None:
+            self._write(path, image, grayscale)
+            return path
+
+        self._pending.append(self._pool.submit(self._write, path, image, grayscale))
+        while len(self._pending) > self.threads * 4:
+            self._pending.popleft().result()
+        return path
+
+    def _write(self, path: str, image, grayscale: bool):
+        start = time.perf_counter()
+        if grayscale and image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        if self.image_format == "npy":
+            with open(path, "wb") as f:
+                np.save(f, np.ascontiguousarray(image))
+                size = f.tell()
+        else:
+            ok, buffer = cv2.imencode(f".{self.image_format}", image, self.params)
+            if not ok:
+                raise IOError(f"Failed to encode frame: {path}")
+            with open(path, "wb") as f:
+                f.write(buffer.tobytes())
+            size = buffer.size
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.bytes_written += size
+            self.encode_seconds += elapsed
+            self.frames_written += 1
+
+    def close(self):
+        """Wait for queued writes; re-raises the first write error."""
+        try:
+            while self._pending:
+                self._pending.popleft().result()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+
+    def summary(self) -> str:
+        return (
+            f"Images written: {self.frames_written} "
+            f"({self.bytes_written / 1_000_000:.1f} MB, {self.image_format}) "
+            f"| Encode time: {self.encode_seconds:.2f}s"
+        )
+
+
+def load_frame(image):
+    """A frame as an array: `image` itself, or read from its path.
+
+    Paths may be any image file or a `.npy` written by `FrameWriter`.
+    Grayscale frames stay single-channel and an alpha channel is dropped,
+    so the result is always grayscale or BGR.
+    """
+    if not isinstance(image, str):
+        return image
+    if image.lower().endswith(".npy"):
+        frame = np.load(image)
+    else:
+        frame = cv2.imread(image, cv2.IMREAD_UNCHANGED)
+    if frame is None:
+        raise IOError(f"Failed to read frame: {image}")
+    if frame.ndim == 3 and frame.shape[2] == 4:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+    return frame
+
+
+def to_gray(image):
+    """`load_frame(image)` as a single-channel grayscale array."""
+    image = load_frame(image)
+    if image.ndim == 2:
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
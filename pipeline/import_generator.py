@@ -1,15 +1,27 @@
 import json
+import logging
 import os
 import toml
 import sys
 from datetime import datetime
 from rapidfuzz.fuzz import token_sort_ratio, token_set_ratio, ratio
 
+from pipeline.progress import ProgressReporter
+from pipeline.step_logger import (
+    NOTICE,
+    get_step_logger,
+    level_from_settings,
+    set_console_level,
+)
+
 STEP_NAME = "import_generator"
 TIMESTAMP = datetime.now().strftime("%Y%m%d_%H%M%S")
 LOG_DIR = "logs"
 LOG_FILE = os.path.join(LOG_DIR, f"{STEP_NAME}_{TIMESTAMP}.log")
 MERGE_LOG_FILE = os.path.join(LOG_DIR, f"{STEP_NAME}_merge_{TIMESTAMP}.log")
+logger = get_step_logger(STEP_NAME, LOG_FILE)
+# Merge details go to their own file, and to the console like other INFO lines.
+merge_logger = get_step_logger(f"{STEP_NAME}_merge", MERGE_LOG_FILE)
 
 MERGE_SUMMARY = {"updates": 0}
 MERGE_UPDATED_IDS = set()
@@ -23,20 +35,16 @@ def ensure_directory_exists(path):
             pass
 
 
-def log(message: str, enabled: bool = True, merge: bool = False):
-    if enabled:
-        print(message)
-    log_path = MERGE_LOG_FILE if merge else LOG_FILE
-    ensure_directory_exists(os.path.dirname(log_path))
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(message + "\n")
+def log(message: str, level: int = NOTICE, merge: bool = False):
+    (merge_logger if merge else logger).log(level, message)
 
 
 def log_merge_summary():
     if MERGE_SUMMARY["updates"] > 0:
-        log(f"\n[Merged] Total updated entries: {MERGE_SUMMARY['updates']}", merge=True)
+        message = f"[Merged] Total updated entries: {MERGE_SUMMARY['updates']}"
     else:
-        log("[Merged] No updates were made.", merge=True)
+        message = "[Merged] No updates were made."
+    log(f"\n{message}", merge=True)
 
 
 def load_main_config(main_config_path: str) -> dict:
@@ -48,10 +56,13 @@ def load_main_config(main_config_path: str) -> dict:
 def load_step_config(step_config_path: str, main_config_path: str) -> dict:
     config = None
     if not os.path.exists(step_config_path):
-        log(f"Step config not found at {step_config_path}, creating default.", True)
+        log(f"Step config not found at {step_config_path}, creating default.")
         create_default_config(step_config_path, main_config_path)
     try:
         config = toml.load(step_config_path)
+        level = level_from_settings(config.get("settings", {}))
+        set_console_level(logger, level)
+        set_console_level(merge_logger, level)
         uploaded_file_path = resolve_uploaded_file(
             config.get("settings", {}), config.get("input", {})
         )
@@ -113,7 +124,7 @@ def create_default_config(config_path: str, main_config_path: str):
 
     fallback_file = "paimon_data/raw.json"
 
-    default_settings = {"threshold": 80, "verbose": True, "merge_uploads": True}
+    default_settings = {"threshold": 80, "log_level": "INFO", "merge_uploads": True}
 
     input_section = {
         "titles_file": None,
@@ -179,7 +190,7 @@ def smart_merge_imports(current_data: dict, uploaded_data: dict) -> dict:
                 set_nested(current_data, keys, True)
                 path_str = "->".join(keys)
                 action = "Created" if existing_val is None else "Updated"
-                log(f"{action} {path_str} = True", merge=True)
+                log(f"{action} {path_str} = True", logging.INFO, merge=True)
                 MERGE_UPDATED_IDS.add(path_str)
                 MERGE_SUMMARY["updates"] += 1
 
@@ -194,7 +205,6 @@ def match_and_update_import(config):
     error_file = config["output"]["error_file"]
     final_import_file = config["output"]["final_import_file"]
     threshold = config["settings"].get("threshold", 90)
-    verbose = config["settings"].get("verbose", True)
     merge_uploads = config["settings"].get("merge_uploads", False)
     uploaded_file = config["input"].get("uploaded_file")
 
@@ -224,12 +234,12 @@ def match_and_update_import(config):
                     default=None,
                 )
         if uploaded_file and os.path.exists(uploaded_file):
-            log(f"[MERGE] Merging from uploaded file: {uploaded_file}", verbose)
+            log(f"[MERGE] Merging from uploaded file: {uploaded_file}", logging.INFO)
             with open(uploaded_file, "r", encoding="utf-8") as f:
                 uploaded_data = json.load(f)
             import_data = smart_merge_imports(import_data, uploaded_data)
         else:
-            log(f"[Warning] No valid uploaded file found for merging.", True)
+            log(f"[Warning] No valid uploaded file found for merging.", logging.WARNING)
             merge_uploads = False
 
     achievement_list = []
@@ -265,8 +275,10 @@ def match_and_update_import(config):
     matched_count, unmatched_count = 0, 0
 
     matched_ids_set = set()
+    reporter = ProgressReporter(log, "titles", len(titles))
     for title in titles:
         best_match = get_best_match(title)
+        reporter.update()
         if best_match:
             matched_name = best_match[0]
             matched_id = id_list[name_list.index(matched_name)]
@@ -277,7 +289,7 @@ def match_and_update_import(config):
             log(
                 f"[MATCH] '{title}' → '{matched_name}' (ID: {matched_id}) Score: {matched_score} "
                 f"| set_ratio={best_match[2]} sort_ratio={best_match[3]} ratio={best_match[4]}",
-                verbose,
+                logging.INFO,
             )
 
             found_in_any = False
@@ -321,22 +333,24 @@ def match_and_update_import(config):
                         checklist[str(matched_id)][sub_key] = True
 
         else:
-            log(f"[NO MATCH] '{title}'", verbose)
+            log(f"[NO MATCH] '{title}'", logging.INFO)
             unmatched_count += 1
             with open(error_file, "a", encoding="utf-8") as ef:
                 ef.write(title + "\n")
 
-    log(f"Matched unique IDs: {len(matched_ids_set)}", True)
+    reporter.finish()
+    log(f"Matched unique IDs: {len(matched_ids_set)}")
     ensure_directory_exists(os.path.dirname(final_import_file))
     with open(final_import_file, "w", encoding="utf-8") as f:
         json.dump(import_data, f, indent=4, ensure_ascii=False)
 
-    log("\n=== DONE ===", True)
-    log(f"Total Titles: {len(titles)}", True)
-    log(f"Matched: {matched_count}", True)
-    log(f"Unmatched: {unmatched_count}", True)
-    log(f"Errors written to: {error_file}", True)
-    log(f"Final import file saved at: {final_import_file}", True)
+    log("\n=== DONE ===")
+    log(f"Total Titles: {len(titles)}")
+    log(f"Matched: {matched_count}")
+    log(f"Unmatched: {unmatched_count}")
+    log(reporter.summary())
+    log(f"Errors written to: {error_file}")
+    log(f"Final import file saved at: {final_import_file}")
 
 
 ###
@@ -344,7 +358,6 @@ def match_and_update_import(config):
 
 def run_from_config(main_config_path: str):
     try:
-        ensure_directory_exists(LOG_DIR)
         if not os.path.exists(main_config_path):
             raise FileNotFoundError(f"Main config path not found: {main_config_path}")
         main_config = load_main_config(main_config_path)
@@ -356,7 +369,7 @@ def run_from_config(main_config_path: str):
         config = load_step_config(step_config_path, main_config_path)
         match_and_update_import(config)
     except Exception as e:
-        log(f"[Fatal Error] {e}", True)
+        log(f"[Fatal Error] {e}", logging.ERROR)
         sys.exit(1)
 
 
@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+
+from pipeline.scroll_estimator import estimate_scroll_offset
+
+SELECTION_MODES = ("diff", "scroll")
+
+
+class KeyframeSelector:
+    """Keep/skip decision for consecutive panel frames.
+
+    The measurement (`measure`) only looks at a pair of frames, so it can run
+    anywhere, e.g. in a segment worker process. The decision (`decide`)
+    carries the scroll position since the last kept frame and must see the
+    measurements in frame order.
+    """
+
+    def __init__(
+        self,
+        diff_threshold: float,
+        selection_mode: str = "scroll",
+        scroll_overlap: float = 0.25,
+        min_scroll_response: float = 0.3,
+    ):
+        if selection_mode not in SELECTION_MODES:
+            raise ValueError(f"Unknown selection_mode: {selection_mode}")
+        self.diff_threshold = diff_threshold
+        self.selection_mode = selection_mode
+        self.scroll_overlap = scroll_overlap
+        self.min_scroll_response = min_scroll_response
+        # Measure the scroll offset even when selecting by diff (used to
+        # adapt the decode stride).
+        self.track_scroll = selection_mode == "scroll"
+
+        # List position of the current and of the last kept frame.
+        self.scroll_pos = 0.0
+        self.keyframe_pos = 0.0
+
+    def measure(self, prev_gray, gray):
+        """Return `(diff, diff_score, offset, response)` for two gray frames."""
+        diff = cv2.absdiff(prev_gray, gray)
+        diff_score = np.sum(diff)
+        if self.track_scroll:
+            offset, response = estimate_scroll_offset(prev_gray, gray)
+        else:
+            offset, response = 0.0, 0.0
+        return diff, diff_score, offset, response
+
+    def decide(self, diff_score, offset: float, response: float, height: int):
+        """Return `(keep, detail)` for the next frame in order."""
+        detail = f"diff: {diff_score}"
+
+        if self.selection_mode == "scroll":
+            if response >= self.min_scroll_response:
+                self.scroll_pos += offset
+                new_content = abs(self.scroll_pos - self.keyframe_pos)
+                keep = new_content >= height * (1 - self.scroll_overlap)
+                detail += f" | new content: {new_content:.0f}px"
+            else:
+                keep = diff_score > self.diff_threshold
+                detail += f" | no clean scroll (response {response:.2f})"
+        else:
+            keep = diff_score > self.diff_threshold
+
+        if keep:
+            self.keyframe_pos = self.scroll_pos
+        return keep, detail
+
+    def has_unseen_tail(self) -> bool:
+        """True when content scrolled in after the last kept frame."""
+        return (
+            self.selection_mode == "scroll"
+            and abs(self.scroll_pos - self.keyframe_pos) >= 1
+        )
@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+
+# Rough peak memory of the CRAFT detector per frame of a batch (a panel
+# crop of about 700x600); `auto_batch_size` spends at most half the free RAM.
+BATCH_BYTES_PER_FRAME = 512 * 1024 * 1024
+MAX_BATCH_SIZE = 16
+DEFAULT_BATCH_SIZE = 4
+
+
+def available_memory():
+    """Free physical memory in bytes, or None if it cannot be determined."""
+    try:
+        import psutil
+
+        return psutil.virtual_memory().available
+    except ImportError:
+        pass
+
+    if sys.platform == "win32":
+        import ctypes
+
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong),
+                ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+
+        status = MemoryStatus()
+        status.dwLength = ctypes.sizeof(MemoryStatus)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullAvailPhys
+        return None
+
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def auto_batch_size() -> int:
+    available = available_memory()
+    if available is None:
+        return DEFAULT_BATCH_SIZE
+    return max(1, min(MAX_BATCH_SIZE, available // 2 // BATCH_BYTES_PER_FRAME))
+
+
+def resolve_batch_size(value, workers: int = 1) -> int:
+    """`ocr_batch_size` setting: a number, or "auto" to size it from free RAM.
+
+    With "auto" the free RAM is shared by `workers` OCR processes.
+    """
+    if value is None or str(value).lower() == "auto":
+        return max(1, auto_batch_size() // max(1, workers))
+    return max(1, int(value))
+
+
+def read_batches(reader, frames, batch_size: int, options: dict = None):
+    """Yield `(frame_name, result, seconds_per_frame)` in input order.
+
+    Frames are grouped by `iter_batches` and each batch is passed to
+    `reader.readtext_batched`, which runs the detector on the whole batch
+    and the recognizer with `batch_size` crops per step. Path batches whose
+    images differ in size are read one by one. `readtext_batched` reads
+    every image exactly like `readtext`, so the per-frame results are the
+    same as the unbatched loop. `options` are extra `readtext` keyword
+    arguments such as `allowlist`.
+    """
+    for batch in iter_batches(frames, batch_size):
+        yield from read_batch(reader, batch, batch_size, options)
+
+
+def iter_batches(frames, batch_size: int):
+    """Group `(frame_name, image)` pairs into lists of up to `batch_size`.
+
+    Batches must hold frames of one size, so a batch is cut early when the
+    array shape changes (paths are grouped regardless).
+    """
+    batch = []
+    shape = None
+    for frame_name, image in frames:
+        image_shape = getattr(image, "shape", None)
+        if batch and image_shape != shape:
+            yield batch
+            batch = []
+        shape = image_shape
+        batch.append((frame_name, image))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def read_batch(reader, batch, batch_size: int, options: dict = None):
+    """OCR one batch; returns `[(frame_name, result, seconds_per_frame)]`."""
+    options = options or {}
+    names = [name for name, _ in batch]
+    images = [image for _, image in batch]
+    start = time.perf_counter()
+    results = None
+    if len(images) > 1 and hasattr(reader, "readtext_batched"):
+        try:
+            results = reader.readtext_batched(images, batch_size=batch_size, **options)
+        except ValueError:
+            # Image files of different sizes cannot be stacked.
+            results = None
+    if results is None:
+        results = [
+            reader.readtext(image, batch_size=batch_size, **options) for image in images
+        ]
+    per_frame = (time.perf_counter() - start) / len(images)
+    return [(name, result, per_frame) for name, result in zip(names, results)]
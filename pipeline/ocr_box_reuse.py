@@ -0,0 +1,121 @@
+from pipeline.card_tracker import estimate_shift, row_strip
+from pipeline.frame_writer import load_frame, to_gray
+
+# Rows of already-seen content the detector sees again next to a new band,
+# so text lines cut by the band edge are detected whole.
+BAND_PADDING = 8
+# Bands thinner than this are not worth a detector call.
+MIN_BAND_HEIGHT = 8
+
+
+class BoxReuseReader:
+    """`readtext` that re-runs the text detector only where content is new.
+
+    Consecutive frames of a scrolling list are mostly the previous frame
+    shifted up or down. The shift is estimated with
+    `card_tracker.estimate_shift`; when it is clear, the previous frame's
+    text boxes are moved by it and CRAFT only runs on the band that
+    scrolled in (plus boxes the band edge cuts through). Frames whose shift
+    is unclear, or whose size changed, get full detection. Recognition then
+    runs on all boxes in one `recognize` call, as `readtext` does.
+
+    Frames must arrive in order, so this works with a single reader only.
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.frames = 0
+        self.full_frames = 0
+        self.rows = 0
+        self.detected_rows = 0
+        self._previous = None
+
+    def readtext(self, image, batch_size: int = 1, **kwargs):
+        image = load_frame(image)
+        gray = to_gray(image)
+        height = gray.shape[0]
+        strip = row_strip(gray)
+
+        shift = None
+        if self._previous is not None and self._previous[0] == gray.shape:
+            shift = estimate_shift(self._previous[1], strip, height // 8, height // 20)
+        if shift is None:
+            horizontal, free = self._detect(image, 0, height)
+            self.full_frames += 1
+        else:
+            horizontal, free = self._predict(image, shift)
+        self._previous = (gray.shape, strip, horizontal, free)
+        self.frames += 1
+        self.rows += height
+
+        if not horizontal and not free:
+            return []
+        return self.reader.recognize(
+            gray,
+            horizontal_list=horizontal,
+            free_list=free,
+            batch_size=batch_size,
+            reformat=False,
+            **kwargs,
+        )
+
+    def recognize(self, *args, **kwargs):
+        return self.reader.recognize(*args, **kwargs)
+
+    def _detect(self, image, top: int, bottom: int):
+        """Detector boxes for rows `top:bottom`, in frame coordinates."""
+        self.detected_rows += bottom - top
+        horizontal, free = self.reader.detect(image[top:bottom])
+        horizontal = [
+            [int(x0), int(x1), int(y0) + top, int(y1) + top]
+            for x0, x1, y0, y1 in horizontal[0]
+        ]
+        free = [[[int(x), int(y) + top] for x, y in box] for box in free[0]]
+        return horizontal, free
+
+    def _predict(self, image, shift: int):
+        """Previous boxes moved by `shift`, plus detection of the new band."""
+        height = image.shape[0]
+        _, _, prev_horizontal, prev_free = self._previous
+        if shift > 0:
+            # Scrolled down: new content at the bottom.
+            band = [max(0, height - shift - BAND_PADDING), height]
+        elif shift < 0:
+            band = [0, min(height, -shift + BAND_PADDING)]
+        else:
+            band = [height, height]
+
+        moved = [[x0, x1, y0 - shift, y1 - shift] for x0, x1, y0, y1 in prev_horizontal]
+        moved_free = [[[x, y - shift] for x, y in box] for box in prev_free]
+        spans = [(box[2], box[3]) for box in moved] + [
+            (min(y for _, y in box), max(y for _, y in box)) for box in moved_free
+        ]
+        # Boxes the band edge cuts through are detected again with the band.
+        for y0, y1 in spans:
+            if y0 < band[1] and y1 > band[0] and y0 >= 0 and y1 <= height:
+                band = [min(band[0], y0), max(band[1], y1)]
+
+        def kept(y0, y1):
+            return y0 >= 0 and y1 <= height and (y1 <= band[0] or y0 >= band[1])
+
+        horizontal = [box for box in moved if kept(box[2], box[3])]
+        free = [
+            box for box, span in zip(moved_free, spans[len(moved) :]) if kept(*span)
+        ]
+        if band[1] - band[0] >= MIN_BAND_HEIGHT:
+            band_horizontal, band_free = self._detect(image, *band)
+            horizontal += band_horizontal
+            free += band_free
+        return horizontal, free
+
+    def summary(self) -> str:
+        reused = self.frames - self.full_frames
+        share = self.detected_rows / self.rows if self.rows else 0.0
+        return (
+            f"Box reuse: {reused} of {self.frames} frames reused boxes, "
+            f"text detection ran on {share:.0%} of rows"
+        )
+
+    def close(self):
+        if hasattr(self.reader, "close"):
+            self.reader.close()
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import deque
+
+DEFAULT_CACHE_PATH = "data/cache/ocr_cache.sqlite"
+# Bump when the stored result format changes; old entries then never match.
+CACHE_VERSION = 1
+# Writes are committed in groups of this many.
+COMMIT_EVERY = 32
+
+
+def _to_json(value):
+    # numpy scalars and arrays in easyocr results (box corners, confidence)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Cannot store {type(value).__name__} in the OCR cache")
+
+
+class OcrCache:
+    """On-disk `readtext` results keyed by image content and OCR settings.
+
+    The key is a SHA-256 of the image (file bytes for paths, pixels plus
+    shape for arrays, since easyocr reads the two slightly differently) and
+    of `settings`, everything that changes the OCR output. Entries are
+    evicted least recently used first once the stored results exceed
+    `max_bytes`.
+    """
+
+    def __init__(
+        self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = 256 * 1024 * 1024
+    ):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._uncommitted = 0
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)"
+        )
+
+    def key(self, image, settings: dict) -> str:
+        digest = hashlib.sha256()
+        digest.update(
+            json.dumps([CACHE_VERSION, settings], sort_keys=True).encode("utf-8")
+        )
+        if isinstance(image, str):
+            digest.update(b"file")
+            with open(image, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        else:
+            digest.update(f"array{image.shape}{image.dtype}".encode("ascii"))
+            digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        row = self._db.execute(
+            "SELECT value FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._db.execute(
+            "UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key)
+        )
+        self._count_write()
+        return json.loads(row[0])
+
+    def put(self, key: str, result):
+        value = json.dumps(result, default=_to_json)
+        self._db.execute(
+            "INSERT OR REPLACE INTO results (key, value, size, last_used) "
+            "VALUES (?, ?, ?, ?)",
+            (key, value, len(value), time.time()),
+        )
+        self._count_write()
+
+    def _count_write(self):
+        self._uncommitted += 1
+        if self._uncommitted >= COMMIT_EVERY:
+            self._db.commit()
+            self._uncommitted = 0
+
+    def size(self) -> int:
+        return self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()[0]
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits `max_bytes`."""
+        excess = self.size() - self.max_bytes
+        if excess <= 0:
+            return 0
+        removed = 0
+        rows = self._db.execute(
+            "SELECT key, size FROM results ORDER BY last_used"
+        ).fetchall()
+        keys = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            keys.append((key,))
+            excess -= size
+            removed += 1
+        self._db.executemany("DELETE FROM results WHERE key = ?", keys)
+        return removed
+
+    def close(self):
+        self.evict()
+        self._db.commit()
+        self._db.close()
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (
+            f"OCR cache: {self.hits} hits, {self.misses} misses ({rate:.1%} hit rate)"
+        )
+
+
+def read_with_cache(cache: OcrCache, frames, read, settings: dict):
+    """Serve `(frame_name, image)` pairs from `cache`, OCR the rest with `read`.
+
+    `read` takes an iterable of frames and yields `(frame_name, result,
+    seconds_per_frame)` in order, like `ocr_batch.read_batches`; it only
+    sees cache misses. Output keeps the input order, hits are reported with
+    0 seconds.
+    """
+    order = deque()
+
+    def misses():
+        for frame_name, image in frames:
+            key = cache.key(image, settings)
+            result = cache.get(key)
+            order.append((frame_name, result, key))
+            if result is None:
+                yield frame_name, image
+
+    for frame_name, result, seconds in read(misses()):
+        while order[0][1] is not None:
+            name, cached, _ = order.popleft()
+            yield name, cached, 0.0
+        _, _, key = order.popleft()
+        cache.put(key, result)
+        yield frame_name, result, seconds
+    while order:
+        name, cached, _ = order.popleft()
+        yield name, cached, 0.0
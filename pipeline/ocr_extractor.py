@@ -1,11 +1,54 @@
-import easyocr
+import json
+import logging
 import os
 import time
 import toml
 import sys
 from collections import OrderedDict
+from itertools import chain
 from datetime import datetime
 
+from pipeline.card_layout import (
+    DEFAULT_STATUS_BOX,
+    DEFAULT_TITLE_BOX,
+    layout_from_settings,
+    layout_reader,
+)
+from pipeline.card_tracker import CardTracker
+from pipeline.frame_gate import CompletedFrameGate
+from pipeline.frame_store import FrameStore
+from pipeline.frame_writer import load_frame
+from pipeline.ocr_cache import DEFAULT_CACHE_PATH, OcrCache, read_with_cache
+from pipeline.ocr_batch import read_batches, resolve_batch_size
+from pipeline.ocr_box_reuse import BoxReuseReader
+from pipeline.ocr_lexicon import (
+    DEFAULT_DB_FILE,
+    Lexicon,
+    character_allowlist,
+    load_achievement_names,
+)
+from pipeline.ocr_pool import OcrPool, resolve_workers
+from pipeline.ocr_server import DEFAULT_ADDRESS, connect
+from pipeline.ocr_two_pass import (
+    DEFAULT_FIRST_PASS_SCALE,
+    DEFAULT_MIN_CONFIDENCE,
+    two_pass_from_settings,
+    two_pass_reader,
+)
+from pipeline.panorama import PanoramaStitcher
+from pipeline.progress import ProgressReporter
+from pipeline.text_scale import (
+    DEFAULT_SAMPLE_FRAMES,
+    DEFAULT_TARGET_HEIGHT,
+    TextScaler,
+)
+from pipeline.step_logger import (
+    NOTICE,
+    get_step_logger,
+    level_from_settings,
+    set_console_level,
+)
+
 STEP_NAME = "ocr_extraction"
 TIMESTAMP = datetime.now().strftime("%Y%m%d_%H%M%S")
 
@@ -23,9 +66,11 @@ def load_main_config(main_config_path: str) -> dict:
 
 def load_step_config(step_config_path: str, main_config_path: str) -> dict:
     if not os.path.exists(step_config_path):
-        log(f"Step config not found at {step_config_path}, creating default.", True)
+        log(f"Step config not found at {step_config_path}, creating default.")
         create_default_config(step_config_path, main_config_path)
-    return toml.load(step_config_path)
+    config = toml.load(step_config_path)
+    set_console_level(logger, level_from_settings(config.get("settings", {})))
+    return config
 
 
 def create_default_config(config_path: str, main_config_path: str):
@@ -37,8 +82,9 @@ def create_default_config(config_path: str, main_config_path: str):
 
     frame_config = toml.load(frame_config_path)
     frame_output_folder = frame_config.get("output", {}).get("folder", "")
+    streaming = main_config.get("pipeline", {}).get("streaming", False)
 
-    if not os.path.exists(frame_output_folder):
+    if not streaming and not os.path.exists(frame_output_folder):
         raise FileNotFoundError(
             f"Frame extraction output folder not found: {frame_output_folder}"
         )
@@ -50,7 +96,39 @@ def create_default_config(config_path: str, main_config_path: str):
     default_config = {
         "input": {"folder": input_folder},
         "output": {"folder": output_folder, "all_titles_file": all_titles_path},
-        "settings": {"language": ["en"], "verbose": True},
+        "settings": {
+            "language": ["en"],
+            "log_level": "INFO",
+            "ocr_server": False,
+            "ocr_server_address": DEFAULT_ADDRESS,
+            "ocr_server_autostart": True,
+            "ocr_batch_size": "auto",
+            "ocr_workers": 1,
+            "ocr_threads_per_worker": "auto",
+            "ocr_cache": True,
+            "ocr_cache_path": DEFAULT_CACHE_PATH,
+            "ocr_cache_max_mb": 256,
+            "card_layout": False,
+            "card_title_box": list(DEFAULT_TITLE_BOX),
+            "card_status_box": list(DEFAULT_STATUS_BOX),
+            "badge_classifier": False,
+            "track_cards": False,
+            "skip_uncompleted_frames": False,
+            "panorama": False,
+            "panorama_tile_height": "auto",
+            "debug_text_files": False,
+            "ocr_allowlist": False,
+            "ocr_lexicon": False,
+            "lexicon_db_file": DEFAULT_DB_FILE,
+            "ocr_two_pass": False,
+            "ocr_first_pass_scale": DEFAULT_FIRST_PASS_SCALE,
+            "ocr_min_confidence": DEFAULT_MIN_CONFIDENCE,
+            "ocr_box_reuse": False,
+            "normalize_text_height": False,
+            "target_text_height": DEFAULT_TARGET_HEIGHT,
+            "text_height_sample_frames": DEFAULT_SAMPLE_FRAMES,
+            "upscale_small_text": False,
+        },
     }
     ensure_directory_exists(os.path.dirname(config_path) or ".")
     with open(config_path, "w") as f:
@@ -60,15 +138,12 @@ def create_default_config(config_path: str, main_config_path: str):
 
 # Logging setup
 LOG_DIR = "logs"
-ensure_directory_exists(LOG_DIR)
 LOG_FILE = os.path.join(LOG_DIR, f"{STEP_NAME}_{TIMESTAMP}.log")
+logger = get_step_logger(STEP_NAME, LOG_FILE)
 
 
-def log(message: str, enabled: bool = True):
-    if enabled:
-        print(message)
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(message + "\n")
+def log(message: str, level: int = NOTICE):
+    logger.log(level, message)
 
 
 def format_time(seconds):
@@ -78,76 +153,280 @@ def format_time(seconds):
     return f"{hours:02}:{minutes:02}:{secs:02}"
 
 
+def create_reader(settings: dict):
+    """`easyocr.Reader`, `ocr_server` client or `OcrPool` for `settings`,
+    wrapped by `card_layout`, `ocr_box_reuse` and `ocr_two_pass` when on."""
+    languages = settings.get("language", ["en"])
+    layout = layout_from_settings(settings)
+    two_pass = two_pass_from_settings(settings)
+    box_reuse = box_reuse_enabled(settings)
+
+    def wrap(reader):
+        reader = layout_reader(reader, layout)
+        if box_reuse:
+            reader = BoxReuseReader(reader)
+        return two_pass_reader(reader, two_pass)
+
+    if settings.get("ocr_server", False):
+        address = settings.get("ocr_server_address", DEFAULT_ADDRESS)
+        try:
+            reader = connect(
+                address, languages, settings.get("ocr_server_autostart", True)
+            )
+            log(f"Using OCR server at {address}", logging.INFO)
+            return wrap(reader)
+        except ConnectionError as e:
+            log(f"[Warning] {e}, loading OCR models in-process.", logging.WARNING)
+
+    workers, threads = resolve_workers(
+        settings.get("ocr_workers", 1),
+        settings.get("ocr_threads_per_worker", "auto"),
+    )
+    if workers > 1 and box_reuse:
+        log("ocr_box_reuse needs frames in order, not starting an OCR pool.")
+    elif workers > 1:
+        log(f"OCR pool: {workers} workers x {threads} threads", logging.INFO)
+        return OcrPool(languages, workers, threads, layout, two_pass)
+
+    import easyocr
+
+    return wrap(easyocr.Reader(languages))
+
+
+def box_reuse_enabled(settings: dict) -> bool:
+    """`ocr_box_reuse`, which card layout mode makes moot (no detector) and
+    panorama tiles do not scroll."""
+    return (
+        settings.get("ocr_box_reuse", False)
+        and not settings.get("card_layout", False)
+        and not settings.get("panorama", False)
+    )
+
+
+def resolve_tile_height(value):
+    """`panorama_tile_height`: rows per tile, or "auto" for the frame height."""
+    if value is None or str(value).lower() == "auto":
+        return None
+    return max(1, int(value))
+
+
+def cache_settings(settings: dict, options: dict = None) -> dict:
+    """The OCR settings that change `readtext` results, for cache keys."""
+    key = {
+        "language": list(settings.get("language", ["en"])),
+        "card_layout": layout_from_settings(settings),
+    }
+    if two_pass_from_settings(settings) is not None:
+        key["two_pass"] = two_pass_from_settings(settings)
+    if box_reuse_enabled(settings):
+        key["box_reuse"] = True
+    if options:
+        key["readtext"] = options
+    return key
+
+
+def titles_from_lines(lines):
+    """Titles of the completed achievements: every line followed by "Completed"."""
+    return [lines[i - 1] for i in range(1, len(lines)) if lines[i] == "Completed"]
+
+
+def write_lines(path: str, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(line + "\n")
+
+
 def extract_titles_from_images(config: dict):
     input_folder = config["input"]["folder"]
-    output_folder = config["output"]["folder"]
-    languages = config["settings"].get("language", ["en"])
-    verbose = config["settings"].get("verbose", True)
 
     if not os.path.exists(input_folder):
         raise FileNotFoundError(f"Input folder not found: {input_folder}")
 
-    ensure_directory_exists(output_folder)
-    reader = easyocr.Reader(languages)
-    combined_titles = OrderedDict()
-    image_files = [
+    if FrameStore.exists(input_folder):
+        # Frames are read straight from the memory-mapped store, no decode.
+        store = FrameStore.open(input_folder)
+        if not len(store):
+            raise FileNotFoundError(f"No frames in frame store: {input_folder}")
+        extract_titles_from_frames(config, iter(store), total=len(store))
+        return
+
+    # Frame names are zero-padded; card tracking, box reuse and the panorama
+    # need the frames in video order. `diff_XXXX` maps written next to them
+    # by `save_gray_diff_map` are not frames.
+    image_files = sorted(
         f
         for f in os.listdir(input_folder)
-        if f.lower().endswith((".png", ".jpg", ".jpeg"))
-    ]
+        if f.startswith("frame_")
+        and f.lower().endswith((".png", ".jpg", ".jpeg", ".webp", ".npy"))
+    )
 
     if not image_files:
         raise FileNotFoundError(f"No images found in folder: {input_folder}")
 
-    start_time = time.time()
-
-    for num, img_file in enumerate(image_files):
-        img_path = os.path.join(input_folder, img_file)
-        log(
-            f"ProcessingFrame: {num} / {image_files.__len__()} | Progress: {num/image_files.__len__():.2f}%",
-            verbose,
+    # EasyOCR reads image files itself; raw `.npy` frames are loaded here.
+    frames = (
+        (
+            os.path.splitext(img_file)[0],
+            (
+                load_frame(os.path.join(input_folder, img_file))
+                if img_file.lower().endswith(".npy")
+                else os.path.join(input_folder, img_file)
+            ),
         )
+        for img_file in image_files
+    )
+    extract_titles_from_frames(config, frames, total=len(image_files))
 
-        result = reader.readtext(img_path)
-        lines = [detection[1].strip() for detection in result]
 
-        raw_text_file = os.path.join(
-            output_folder, f"{os.path.splitext(img_file)[0]}_raw.txt"
+def extract_titles_from_frames(config: dict, frames, total: int = None):
+    """OCR `(frame_name, image)` pairs (paths or arrays); each setting is
+    described in the module it enables (`ocr_batch`, `text_scale`,
+    `card_tracker`, `panorama`, `frame_gate`, ...)."""
+    output_folder = config["output"]["folder"]
+    settings = config["settings"]
+
+    ensure_directory_exists(output_folder)
+    readers = []
+
+    options = {}
+    lexicon = None
+    if settings.get("ocr_allowlist", False) or settings.get("ocr_lexicon", False):
+        names = load_achievement_names(settings.get("lexicon_db_file", DEFAULT_DB_FILE))
+        if settings.get("ocr_allowlist", False):
+            options["allowlist"] = character_allowlist(names)
+        if settings.get("ocr_lexicon", False):
+            lexicon = Lexicon(names)
+
+    def ocr(frames):
+        frames = iter(frames)
+        first = next(frames, None)
+        if first is None:
+            return
+        reader = create_reader(settings)
+        readers.append(reader)
+        batch_size = resolve_batch_size(
+            settings.get("ocr_batch_size", "auto"),
+            reader.workers if isinstance(reader, OcrPool) else 1,
         )
-        with open(raw_text_file, "w", encoding="utf-8") as f:
-            for line in lines:
-                f.write(line + "\n")
-
-    # Post-process titles after all OCR is done
-    for img_file in image_files:
-        raw_text_file = os.path.join(
-            output_folder, f"{os.path.splitext(img_file)[0]}_raw.txt"
+        log(f"OCR batch size: {batch_size}", logging.INFO)
+        frames = chain([first], frames)
+        if isinstance(reader, OcrPool):
+            yield from reader.read_batches(frames, batch_size, options)
+        else:
+            yield from read_batches(reader, frames, batch_size, options)
+
+    cache = None
+    if settings.get("ocr_cache", True):
+        cache = OcrCache(
+            settings.get("ocr_cache_path", DEFAULT_CACHE_PATH),
+            int(settings.get("ocr_cache_max_mb", 256) * 1024 * 1024),
         )
-        if not os.path.exists(raw_text_file):
-            continue
-        with open(raw_text_file, "r", encoding="utf-8") as f:
-            lines = [line.strip() for line in f.readlines() if line.strip()]
-
-        titles = []
-        for i in range(1, len(lines)):
-            if lines[i] == "Completed":
-                title = lines[i - 1]
-                titles.append(title)
-                combined_titles[title] = None
+    combined_titles = OrderedDict()
+    frame_names = []
+    debug_text_files = settings.get("debug_text_files", False)
+    detections_file = os.path.join(output_folder, "detections.jsonl")
+
+    start_time = time.time()
+
+    scaler = None
+    if settings.get("normalize_text_height", False):
+        scaler = TextScaler(
+            settings.get("target_text_height", DEFAULT_TARGET_HEIGHT),
+            settings.get("text_height_sample_frames", DEFAULT_SAMPLE_FRAMES),
+            settings.get("upscale_small_text", False),
+        )
+        frames = scaler.scale_frames(frames)
 
-        titles_file = os.path.join(
-            output_folder, f"{os.path.splitext(img_file)[0]}_titles.txt"
+    tracker = None
+    stitcher = None
+    if settings.get("panorama", False):
+        stitcher = PanoramaStitcher(
+            resolve_tile_height(settings.get("panorama_tile_height", "auto"))
         )
-        with open(titles_file, "w", encoding="utf-8") as f:
+        frames = stitcher.tiles_from_frames(frames)
+    elif settings.get("track_cards", False):
+        tracker = CardTracker()
+
+    # Input position of each frame, so frames the tracker or the gate drop
+    # still count towards the progress total.
+    positions = {}
+
+    def numbered(frames):
+        for frame_name, image in frames:
+            positions[frame_name] = len(positions) + 1
+            yield frame_name, image
+
+    if tracker is not None or settings.get("skip_uncompleted_frames", False):
+        frames = numbered(frames)
+        if tracker is not None:
+            frames = tracker.new_card_frames(frames)
+
+    gate = None
+    if settings.get("skip_uncompleted_frames", False):
+        gate = CompletedFrameGate(settings.get("card_status_box", DEFAULT_STATUS_BOX))
+        frames = gate.filter(frames)
+
+    if stitcher is not None:
+        # Tiles, not frames, are read; their count is known at the end.
+        reporter = ProgressReporter(log, "tiles")
+    else:
+        reporter = ProgressReporter(log, "images", total)
+    if cache is not None:
+        results = read_with_cache(cache, frames, ocr, cache_settings(settings, options))
+    else:
+        results = ocr(frames)
+    with open(detections_file, "w", encoding="utf-8") as detections:
+        for frame_name, result, seconds in results:
+            log(f"ProcessingFrame: {frame_name}", logging.DEBUG)
+            if frame_name in positions:
+                reporter.skip(positions[frame_name] - 1 - reporter.done)
+            reporter.update(latency=seconds)
+            if gate is not None:
+                gate.learn(frame_name, result, seconds)
+            # Undo the crop, then the rescale, so boxes are in frame pixels.
+            if tracker is not None:
+                result = tracker.to_frame(frame_name, result)
+            if scaler is not None:
+                result = scaler.to_frame(result)
+            lines = [detection[1].strip() for detection in result]
+            titles = titles_from_lines([line for line in lines if line])
+            if lexicon is not None:
+                titles = [lexicon.correct(title) for title in titles]
             for title in titles:
-                f.write(title + "\n")
+                combined_titles[title] = None
+
+            for bbox, text, confidence in result:
+                record = {
+                    "frame": frame_name,
+                    "text": text.strip(),
+                    "bbox": [[float(x), float(y)] for x, y in bbox],
+                    "confidence": float(confidence),
+                }
+                detections.write(json.dumps(record) + "\n")
+            detections.flush()
+
+            if debug_text_files:
+                write_lines(os.path.join(output_folder, f"{frame_name}_raw.txt"), lines)
+                write_lines(
+                    os.path.join(output_folder, f"{frame_name}_titles.txt"), titles
+                )
+            frame_names.append(frame_name)
+
+    reporter.skip(len(positions) - reporter.done)
+    reporter.finish()
+    for reader in readers:
+        if hasattr(reader, "close"):
+            reader.close()
+    if cache is not None:
+        cache.close()
+    if not frame_names:
+        raise FileNotFoundError("No frames were provided for OCR.")
 
     combined_titles_file = os.path.join(output_folder, "all_titles.txt")
-    with open(combined_titles_file, "w", encoding="utf-8") as f:
-        for title in combined_titles:
-            f.write(title + "\n")
+    write_lines(combined_titles_file, combined_titles)
 
     config["output"]["all_titles_file"] = combined_titles_file
+    config["output"]["detections_file"] = detections_file
 
     main_config_path = config.get("_main_config_path", "")
     if main_config_path:
@@ -159,13 +438,33 @@ def extract_titles_from_images(config: dict):
 
     end_time = time.time()
     total_time_sec = end_time - start_time
-    avg_time_sec = total_time_sec / len(image_files)
-
-    log("\n=== OCR Summary ===", True)
-    log(f"Processed {len(image_files)} images.", True)
-    log(f"Total time: {format_time(total_time_sec)}", True)
-    log(f"Avg time/image: {format_time(avg_time_sec)}", True)
-    log(f"Titles saved to: {combined_titles_file}", True)
+    avg_time_sec = total_time_sec / len(frame_names)
+
+    log("\n=== OCR Summary ===")
+    log(f"Processed {len(frame_names)} images.")
+    log(f"Total time: {format_time(total_time_sec)}")
+    log(f"Avg time/image: {format_time(avg_time_sec)}")
+    log(reporter.summary())
+    if scaler is not None:
+        log(scaler.summary())
+    if stitcher is not None:
+        log(stitcher.summary())
+    if tracker is not None:
+        log(tracker.summary())
+    if gate is not None:
+        log(gate.summary())
+    if lexicon is not None:
+        log(lexicon.summary())
+    if cache is not None:
+        log(cache.summary())
+    for reader in readers:
+        # Wrapped readers (two-pass around card layout) each report.
+        while reader is not None:
+            if hasattr(reader, "summary"):
+                log(reader.summary())
+            reader = getattr(reader, "reader", None)
+    log(f"Titles saved to: {combined_titles_file}")
+    log(f"Detections saved to: {detections_file}")
 
 
 def run_from_config(main_config_path: str):
@@ -178,7 +477,26 @@ def run_from_config(main_config_path: str):
         extract_titles_from_images(config)
 
     except Exception as e:
-        log(f"[Fatal Error] {e}", True)
+        log(f"[Fatal Error] {e}", logging.ERROR)
+        sys.exit(1)
+
+
+def run_streaming_from_config(main_config_path: str):
+    """Run frame extraction and OCR as one step, passing frames in memory."""
+    from pipeline.frame_extractor import stream_frames_from_config
+
+    try:
+        frames = stream_frames_from_config(main_config_path)
+
+        main_config = load_main_config(main_config_path)
+        ocr_config_path = main_config["steps"].get("ocr_extraction")
+        config = load_step_config(ocr_config_path, main_config_path)
+        config["_main_config_path"] = main_config_path
+
+        extract_titles_from_frames(config, frames)
+
+    except Exception as e:
+        log(f"[Fatal Error] {e}", logging.ERROR)
         sys.exit(1)
 
 
@@ -0,0 +1,176 @@
+"""Achievement-name lexicon for OCR.
+
+Every title the pipeline can match is in the achievement database, so OCR
+can be restricted to it in two ways:
+
+- `character_allowlist` limits the recognizer to the characters used by the
+  names (plus the "Completed" status), e.g. no `1` or `|` to mistake for `l`;
+- `Lexicon.correct` snaps a decoded title to the closest name with a
+  branch-and-bound search over a trie of normalized names.
+
+`python -m pipeline.ocr_lexicon <frames folder>` compares both against the
+plain `readtext` path on the same frames.
+"""
+
+import argparse
+import json
+import os
+import time
+
+DEFAULT_DB_FILE = "paimon_data/en.json"
+STATUS_TEXT = "Completed"
+# Characters of the progress count ("3/10") unfinished cards show instead.
+PROGRESS_CHARACTERS = "0123456789/"
+# Largest share of a title's characters that may be edited to reach a name.
+MAX_EDIT_RATIO = 0.25
+
+# Lowercase, then fold glyphs OCR confuses and typographic punctuation.
+_CONFUSABLES = str.maketrans("i10|’‘“”—–", "llol''\"\"--")
+_END = ""
+
+
+def load_achievement_names(db_file: str = DEFAULT_DB_FILE):
+    """Names of all achievements in the paimon.moe database file."""
+    with open(db_file, "r", encoding="utf-8") as f:
+        db_data = json.load(f)
+    names = []
+    for category in db_data.values():
+        for entry in category.get("achievements", []):
+            entries = entry if isinstance(entry, list) else [entry]
+            names.extend(a["name"] for a in entries if "name" in a)
+    return names
+
+
+def character_allowlist(names) -> str:
+    """Every character used by `names` or the status and progress text."""
+    characters = set("".join(names)) | set(STATUS_TEXT) | set(PROGRESS_CHARACTERS)
+    return "".join(sorted(characters))
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().translate(_CONFUSABLES).split())
+
+
+class Lexicon:
+    """Closest achievement name to an OCR'd title.
+
+    Names are stored in a trie by their normalized form. `closest` walks it
+    depth first, keeping one Levenshtein row per trie node, and abandons a
+    branch as soon as its best row value cannot beat the best name found so
+    far, so only a small part of the trie is visited.
+    """
+
+    def __init__(self, names):
+        self.root = {}
+        for name in names:
+            node = self.root
+            for char in normalize(name):
+                node = node.setdefault(char, {})
+            node.setdefault(_END, name)
+        self.counts = {"exact": 0, "corrected": 0, "unknown": 0}
+
+    def closest(self, text: str, max_distance: int):
+        """`(name, distance)` of the closest name, or `(None, None)`."""
+        key = normalize(text)
+        best = [max_distance + 1, None]
+
+        def search(node, char, previous):
+            row = [previous[0] + 1]
+            for i in range(1, len(key) + 1):
+                row.append(
+                    min(
+                        row[i - 1] + 1,
+                        previous[i] + 1,
+                        previous[i - 1] + (key[i - 1] != char),
+                    )
+                )
+            if _END in node and row[-1] < best[0]:
+                best[:] = [row[-1], node[_END]]
+            if min(row) < best[0]:
+                for next_char, child in node.items():
+                    if next_char != _END:
+                        search(child, next_char, row)
+
+        first_row = list(range(len(key) + 1))
+        for char, child in self.root.items():
+            if char != _END:
+                search(child, char, first_row)
+        if best[1] is None:
+            return None, None
+        return best[1], best[0]
+
+    def correct(self, text: str) -> str:
+        """The name `text` most likely reads, or `text` if none is close."""
+        max_distance = max(1, int(len(normalize(text)) * MAX_EDIT_RATIO))
+        name, distance = self.closest(text, max_distance)
+        if name is None:
+            self.counts["unknown"] += 1
+            return text
+        self.counts["exact" if name == text else "corrected"] += 1
+        return name
+
+    def summary(self) -> str:
+        counts = self.counts
+        return (
+            f"Lexicon: {counts['exact']} titles exact, {counts['corrected']} "
+            f"corrected, {counts['unknown']} not in the database"
+        )
+
+
+def _titles(result):
+    lines = [detection[1].strip() for detection in result]
+    lines = [line for line in lines if line]
+    return [lines[i - 1] for i in range(1, len(lines)) if lines[i] == STATUS_TEXT]
+
+
+def compare(frames_folder: str, db_file: str = DEFAULT_DB_FILE, languages=("en",)):
+    """OCR every frame in `frames_folder` with and without the allowlist and
+    print time per frame and how many titles are database names."""
+    import easyocr
+
+    from pipeline.frame_store import FrameStore
+
+    names = load_achievement_names(db_file)
+    known = set(names)
+    lexicon = Lexicon(names)
+    if FrameStore.exists(frames_folder):
+        frames = list(FrameStore.open(frames_folder))
+    else:
+        frames = [
+            (name, os.path.join(frames_folder, name))
+            for name in sorted(os.listdir(frames_folder))
+            if name.lower().endswith((".png", ".jpg", ".jpeg", ".webp"))
+        ]
+    reader = easyocr.Reader(list(languages))
+    modes = [
+        ("readtext", {}),
+        ("allowlist", {"allowlist": character_allowlist(names)}),
+    ]
+    for label, options in modes:
+        start = time.perf_counter()
+        titles = []
+        for _, image in frames:
+            titles.extend(_titles(reader.readtext(image, **options)))
+        seconds = (time.perf_counter() - start) / max(1, len(frames))
+        corrected = [lexicon.correct(title) for title in titles]
+        print(
+            f"{label:<10} {seconds * 1000:8.1f} ms/frame | {len(titles)} titles | "
+            f"{sum(t in known for t in titles)} exact names | "
+            f"{sum(t in known for t in corrected)} after lexicon"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare plain and lexicon-constrained OCR on extracted frames."
+    )
+    parser.add_argument("frames", help="frame extraction output folder")
+    parser.add_argument("--db", default=DEFAULT_DB_FILE, help="achievement database")
+    args = parser.parse_args()
+    if not os.path.exists(args.db):
+        raise FileNotFoundError(f"Database file not found: {args.db}")
+    compare(args.frames, args.db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from pipeline.card_layout import layout_reader
+from pipeline.ocr_batch import available_memory, iter_batches, read_batch
+from pipeline.ocr_two_pass import two_pass_reader
+
+# CPU threads a single Reader uses well; more mostly adds contention.
+THREADS_PER_WORKER = 4
+# Rough RAM of one worker: torch plus the detector and recognizer weights.
+WORKER_BYTES = 1536 * 1024 * 1024
+
+# The Reader of this worker process, created by `_init_worker`.
+_reader = None
+
+
+def _init_worker(languages, threads: int, layout=None, two_pass=None):
+    global _reader
+    import torch
+    import easyocr
+
+    torch.set_num_threads(threads)
+    _reader = layout_reader(easyocr.Reader(list(languages), gpu=False), layout)
+    _reader = two_pass_reader(_reader, two_pass)
+
+
+def _read_batch(batch, batch_size: int, options: dict = None):
+    """Results of a batch, with this worker's reader counters so far."""
+    results = read_batch(_reader, batch, batch_size, options)
+    return os.getpid(), results, reader_counters(_reader)
+
+
+def reader_counters(reader):
+    """`{name: value}` of the `COUNTERS` of each reader in a wrapped chain."""
+    chain = []
+    while reader is not None:
+        chain.append(
+            {name: getattr(reader, name) for name in getattr(reader, "COUNTERS", ())}
+        )
+        reader = getattr(reader, "reader", None)
+    return chain
+
+
+def _add(total, value):
+    if isinstance(value, dict):
+        return {key: total.get(key, 0) + value[key] for key in value}
+    return total + value
+
+
+def cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def resolve_workers(workers="auto", threads="auto"):
+    """`(workers, threads_per_worker)` from the `ocr_workers` and
+    `ocr_threads_per_worker` settings.
+
+    "auto" workers is 1 (no pool) with a CUDA GPU, else one worker per
+    `THREADS_PER_WORKER` cores, but no more than half the free RAM holds
+    (`WORKER_BYTES` each); "auto" threads splits the cores evenly so
+    `workers * threads` never exceeds the core count.
+    """
+    cores = cpu_count()
+    if str(workers).lower() == "auto":
+        if _has_cuda():
+            workers = 1
+        else:
+            workers = max(1, cores // THREADS_PER_WORKER)
+            available = available_memory()
+            if available is not None:
+                workers = max(1, min(workers, available // 2 // WORKER_BYTES))
+    workers = max(1, int(workers))
+    if str(threads).lower() == "auto":
+        threads = max(1, cores // workers)
+    return workers, max(1, int(threads))
+
+
+def _has_cuda() -> bool:
+    try:
+        import torch
+
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+class OcrPool:
+    """CPU OCR sharded over worker processes, each with its own Reader.
+
+    Batches from `ocr_batch.iter_batches` are handed out round the pool as
+    workers become free; `read_batches` yields the results in frame order.
+    Workers are started with `spawn` so they do not inherit torch's thread
+    pools from this process. `layout` wraps each worker's Reader in a
+    `CardLayoutReader` and `two_pass` in a `TwoPassReader`; their counters
+    come back with every batch and `summary` adds them up.
+    """
+
+    def __init__(
+        self, languages, workers: int, threads: int, layout=None, two_pass=None
+    ):
+        self.workers = workers
+        self.threads = threads
+        # Model-less copies of the worker readers, for their summaries.
+        self._summary_readers = two_pass_reader(layout_reader(None, layout), two_pass)
+        self._counters = {}
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(list(languages), threads, layout, two_pass),
+        )
+
+    def read_batches(self, frames, batch_size: int, options: dict = None):
+        """Same output as `ocr_batch.read_batches`, computed in parallel."""
+        pending = deque()
+        for batch in iter_batches(frames, batch_size):
+            pending.append(self._pool.submit(_read_batch, batch, batch_size, options))
+            # A couple of batches per worker in flight, not the whole video.
+            while len(pending) > self.workers * 2:
+                yield from self._result(pending.popleft())
+        while pending:
+            yield from self._result(pending.popleft())
+
+    def _result(self, future):
+        pid, results, counters = future.result()
+        self._counters[pid] = counters
+        return results
+
+    def summary(self) -> str:
+        """Pool size, then the summaries of the worker readers, summed."""
+        lines = [f"OCR pool: {self.workers} workers x {self.threads} threads"]
+        reader = self._summary_readers
+        for depth, names in enumerate(reader_counters(reader)):
+            for name in names:
+                total = {} if isinstance(names[name], dict) else 0
+                for chain in self._counters.values():
+                    total = _add(total, chain[depth][name])
+                setattr(reader, name, total)
+            lines.append(reader.summary())
+            reader = reader.reader
+        return "\n".join(lines)
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
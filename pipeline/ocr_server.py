@@ -0,0 +1,230 @@
+"""Long-lived OCR worker that keeps `easyocr.Reader` loaded between runs.
+
+Start it once with `python -m pipeline.ocr_server` and set
+`ocr_server = true` in `ocr_extraction.toml`; every pipeline run then sends
+its frames here instead of importing torch and loading the detector and
+recognizer weights again. Readers are created on the first request for a
+language list and kept until the server stops.
+"""
+
+import argparse
+import builtins
+import os
+import secrets
+import subprocess
+import sys
+import time
+from datetime import datetime
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from pipeline.step_logger import get_step_logger
+
+STEP_NAME = "ocr_server"
+TIMESTAMP = datetime.now().strftime("%Y%m%d_%H%M%S")
+LOG_DIR = "logs"
+DEFAULT_ADDRESS = "127.0.0.1:50515"
+# Only processes that can read this file can talk to the server. The key
+# is random per user and the file is private to them, so other users of a
+# shared machine cannot send it requests (which are unpickled).
+AUTHKEY_FILE = os.path.join(os.path.expanduser("~"), ".achievement_marker_ocr_key")
+# How long `connect` waits for an auto-started server to accept connections.
+STARTUP_TIMEOUT = 30.0
+
+
+def load_authkey(path: str = AUTHKEY_FILE) -> bytes:
+    """The server key from `path`, created with a random key on first use."""
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Another process may have just created it and not written it yet.
+        for _ in range(50):
+            with open(path, "rb") as f:
+                key = f.read()
+            if key:
+                return key
+            time.sleep(0.02)
+        raise ConnectionError(f"OCR server key file is empty: {path}")
+    key = secrets.token_hex(32).encode()
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def parse_address(address: str):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class OcrClient:
+    """Connection to a running OCR server with the `Reader.readtext` interface."""
+
+    def __init__(self, connection, languages):
+        self.connection = connection
+        self.languages = list(languages)
+
+    def readtext(self, image, **kwargs):
+        """`image` is a path (read by the server) or an in-memory array."""
+        return self._call("readtext", _absolute(image), kwargs)
+
+    def readtext_batched(self, images, **kwargs):
+        return self._call(
+            "readtext_batched", [_absolute(image) for image in images], kwargs
+        )
+
+    def recognize(self, image, **kwargs):
+        return self._call("recognize", image, kwargs)
+
+    def detect(self, image, **kwargs):
+        return self._call("detect", image, kwargs)
+
+    def _call(self, method: str, image, kwargs: dict):
+        self.connection.send((method, self.languages, image, kwargs))
+        status, payload = self.connection.recv()
+        if status == "error":
+            # The server sends the exception's type name and message, e.g.
+            # the ValueError for a batch of differently sized images.
+            name, message = payload
+            error = getattr(builtins, name, None)
+            if isinstance(error, type) and issubclass(error, Exception):
+                raise error(message)
+            raise RuntimeError(f"{name}: {message}")
+        return payload
+
+    def ping(self) -> bool:
+        self.connection.send(("ping",))
+        return self.connection.recv()[0] == "ok"
+
+    def close(self):
+        self.connection.close()
+
+
+def _absolute(image):
+    # The server may run from another working directory.
+    return os.path.abspath(image) if isinstance(image, str) else image
+
+
+def connect(address: str = DEFAULT_ADDRESS, languages=("en",), autostart=False):
+    """Return an `OcrClient` for the server at `address`.
+
+    With `autostart` a missing server is started in the background (it keeps
+    running after this process exits). Raises `ConnectionError` if no server
+    can be reached.
+    """
+    try:
+        return OcrClient(
+            Client(parse_address(address), authkey=load_authkey()), languages
+        )
+    except AuthenticationError:
+        raise ConnectionError(f"OCR server at {address} rejected our key")
+    except (ConnectionRefusedError, OSError):
+        if not autostart:
+            raise ConnectionError(f"No OCR server at {address}")
+
+    start_server_process(address)
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.2)
+        try:
+            return OcrClient(
+                Client(parse_address(address), authkey=load_authkey()), languages
+            )
+        except AuthenticationError:
+            raise ConnectionError(f"OCR server at {address} rejected our key")
+        except (ConnectionRefusedError, OSError):
+            continue
+    raise ConnectionError(f"OCR server at {address} did not start")
+
+
+def start_server_process(address: str = DEFAULT_ADDRESS):
+    """Launch `python -m pipeline.ocr_server` detached from this process."""
+    return subprocess.Popen(
+        [sys.executable, "-m", "pipeline.ocr_server", "--address", address],
+        cwd=os.getcwd(),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def serve(address: str = DEFAULT_ADDRESS):
+    """Answer OCR requests one connection at a time until shut down."""
+    import easyocr
+
+    logger = get_step_logger(
+        STEP_NAME, os.path.join(LOG_DIR, f"{STEP_NAME}_{TIMESTAMP}.log")
+    )
+    readers = {}
+
+    def get_reader(languages):
+        key = tuple(languages)
+        if key not in readers:
+            start = time.perf_counter()
+            readers[key] = easyocr.Reader(list(languages))
+            logger.info(
+                f"Loaded reader {list(key)} in {time.perf_counter() - start:.1f}s"
+            )
+        return readers[key]
+
+    with Listener(parse_address(address), authkey=load_authkey()) as listener:
+        logger.info(f"OCR server listening on {address}")
+        while True:
+            try:
+                connection = listener.accept()
+            except Exception as e:
+                logger.error(f"[Error] Connection failed: {e}")
+                continue
+
+            with connection:
+                images = 0
+                while True:
+                    try:
+                        request = connection.recv()
+                    except EOFError:
+                        break
+
+                    command = request[0]
+                    if command == "shutdown":
+                        connection.send(("ok", None))
+                        logger.info("Shutdown requested.")
+                        return
+                    if command == "ping":
+                        connection.send(("ok", sorted(readers)))
+                        continue
+
+                    try:
+                        if command not in (
+                            "readtext",
+                            "readtext_batched",
+                            "recognize",
+                            "detect",
+                        ):
+                            raise ValueError(f"Unknown OCR server command: {command}")
+                        _, languages, image, kwargs = request
+                        reader = get_reader(languages)
+                        result = getattr(reader, command)(image, **kwargs)
+                        connection.send(("ok", result))
+                        images += len(image) if command == "readtext_batched" else 1
+                    except Exception as e:
+                        connection.send(("error", (type(e).__name__, str(e))))
+                logger.info(f"Client done, {images} images.")
+
+
+def shutdown(address: str = DEFAULT_ADDRESS):
+    client = OcrClient(Client(parse_address(address), authkey=load_authkey()), [])
+    client.connection.send(("shutdown",))
+    client.connection.recv()
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--address", default=DEFAULT_ADDRESS)
+    parser.add_argument("--stop", action="store_true", help="stop a running server")
+    args = parser.parse_args()
+
+    if args.stop:
+        shutdown(args.address)
+    else:
+        serve(args.address)
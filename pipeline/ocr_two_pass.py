@@ -0,0 +1,169 @@
+import time
+
+import cv2
+import numpy as np
+
+from pipeline.frame_writer import load_frame, to_gray
+
+DEFAULT_FIRST_PASS_SCALE = 0.5
+DEFAULT_MIN_CONFIDENCE = 0.5
+# Second-pass crops are enlarged until their text is at least this tall.
+SECOND_PASS_HEIGHT = 48
+# Pixels of context kept around a weak box, and between stacked crops.
+CROP_PADDING = 4
+
+
+class TwoPassReader:
+    """`readtext` on a downscaled frame, then a closer look at weak reads.
+
+    The first pass runs the full reader on the frame scaled by `scale`,
+    which makes the detector several times cheaper. Every detection whose
+    confidence is below `min_confidence` is cropped again from the
+    full-resolution frame, contrast-enhanced (CLAHE), upscaled to
+    `SECOND_PASS_HEIGHT` if needed and recognized once more; the better of
+    the two reads is kept. All weak crops of a frame are stacked into one
+    image so the second pass is a single `recognize` call.
+    """
+
+    # Read back from OCR pool workers, see `ocr_pool.reader_counters`.
+    COUNTERS = ("regions", "improved", "seconds")
+
+    def __init__(
+        self,
+        reader,
+        scale: float = DEFAULT_FIRST_PASS_SCALE,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+    ):
+        self.reader = reader
+        self.scale = scale
+        self.min_confidence = min_confidence
+        self.regions = 0
+        self.improved = 0
+        self.seconds = 0.0
+        self._clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+
+    def _downscale(self, image):
+        if self.scale >= 1:
+            return image
+        return cv2.resize(
+            image, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA
+        )
+
+    def _rescale(self, result):
+        if self.scale >= 1:
+            return result
+        return [
+            ([[x / self.scale, y / self.scale] for x, y in box], text, confidence)
+            for box, text, confidence in result
+        ]
+
+    def readtext(self, image, batch_size: int = 1, **kwargs):
+        image = load_frame(image)
+        result = self.reader.readtext(
+            self._downscale(image), batch_size=batch_size, **kwargs
+        )
+        return self._second_pass(image, self._rescale(result), batch_size, kwargs)
+
+    def readtext_batched(self, images, batch_size: int = 1, **kwargs):
+        images = [load_frame(image) for image in images]
+        if not hasattr(self.reader, "readtext_batched"):
+            return [self.readtext(image, batch_size, **kwargs) for image in images]
+        results = self.reader.readtext_batched(
+            [self._downscale(image) for image in images],
+            batch_size=batch_size,
+            **kwargs,
+        )
+        return [
+            self._second_pass(image, self._rescale(result), batch_size, kwargs)
+            for image, result in zip(images, results)
+        ]
+
+    def recognize(self, *args, **kwargs):
+        return self.reader.recognize(*args, **kwargs)
+
+    def _second_pass(self, image, result, batch_size, kwargs):
+        weak = [
+            i for i, (_, _, conf) in enumerate(result) if conf < self.min_confidence
+        ]
+        if not weak:
+            return result
+        start = time.perf_counter()
+        gray = to_gray(image)
+
+        crops = []
+        for i in list(weak):
+            box = np.asarray(result[i][0])
+            x0, y0 = np.maximum(box.min(axis=0).astype(int) - CROP_PADDING, 0)
+            x1, y1 = box.max(axis=0).astype(int) + CROP_PADDING
+            crop = gray[y0:y1, x0:x1]
+            if not crop.size:
+                weak.remove(i)
+                continue
+            crop = self._clahe.apply(crop)
+            if 0 < crop.shape[0] < SECOND_PASS_HEIGHT:
+                factor = SECOND_PASS_HEIGHT / crop.shape[0]
+                crop = cv2.resize(
+                    crop, None, fx=factor, fy=factor, interpolation=cv2.INTER_CUBIC
+                )
+            crops.append(crop)
+        if not crops:
+            return result
+
+        # One canvas, crops stacked top to bottom on a neutral background.
+        width = max(crop.shape[1] for crop in crops)
+        height = sum(crop.shape[0] + CROP_PADDING for crop in crops)
+        canvas = np.full((height, width), int(np.median(gray)), dtype=np.uint8)
+        boxes = []
+        y = 0
+        for crop in crops:
+            canvas[y : y + crop.shape[0], : crop.shape[1]] = crop
+            boxes.append([0, crop.shape[1], y, y + crop.shape[0]])
+            y += crop.shape[0] + CROP_PADDING
+
+        reads = self.reader.recognize(
+            canvas,
+            horizontal_list=boxes,
+            free_list=[],
+            batch_size=batch_size,
+            reformat=False,
+            **kwargs,
+        )
+        # The recognizer sorts its crops by position; map them back by top.
+        by_top = {int(read[0][0][1]): read for read in reads}
+        result = list(result)
+        for i, box in zip(weak, boxes):
+            read = by_top.get(box[2])
+            if read is not None and read[2] > result[i][2]:
+                result[i] = (result[i][0], read[1], read[2])
+                self.improved += 1
+        self.regions += len(weak)
+        self.seconds += time.perf_counter() - start
+        return result
+
+    def summary(self) -> str:
+        return (
+            f"Second pass: {self.regions} regions re-read "
+            f"({self.improved} improved) in {self.seconds:.1f}s"
+        )
+
+    def close(self):
+        if hasattr(self.reader, "close"):
+            self.reader.close()
+
+
+def two_pass_from_settings(settings: dict):
+    """`(scale, min_confidence)` when `ocr_two_pass` is on, else None."""
+    if not settings.get("ocr_two_pass", False):
+        return None
+    return (
+        float(settings.get("ocr_first_pass_scale", DEFAULT_FIRST_PASS_SCALE)),
+        float(settings.get("ocr_min_confidence", DEFAULT_MIN_CONFIDENCE)),
+    )
+
+
+def two_pass_reader(reader, two_pass):
+    """Wrap `reader` for the `two_pass` settings from `two_pass_from_settings`."""
+    if two_pass is None:
+        return reader
+    scale, min_confidence = two_pass
+    return TwoPassReader(reader, scale, min_confidence)
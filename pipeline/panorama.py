@@ -0,0 +1,184 @@
+import cv2
+import numpy as np
+
+from pipeline.card_layout import find_cards
+from pipeline.card_tracker import (
+    BAND_PADDING,
+    estimate_shift,
+    list_margin,
+    row_strip,
+    shift_limits,
+)
+from pipeline.frame_writer import load_frame, to_gray
+
+# A frame that does not overlap the previous one is looked up in this many
+# frame heights at the bottom of the panorama; only they are kept for it.
+SEARCH_FRAMES = 4
+
+
+class PanoramaStitcher:
+    """Stitches overlapping frames of the scrolled list into one tall image
+    and cuts it into tiles that are each OCR'd once.
+
+    The scroll between consecutive frames is estimated with
+    `card_tracker.estimate_shift`, and every frame adds only the rows below
+    what the panorama already holds, so content seen in several frames (or
+    again after scrolling back) is kept once. Tiles of `tile_height` rows
+    are cut from the top as soon as they are complete, just below the last
+    whole card, and padded to `tile_height` so they batch like frames; the
+    next tile starts where the previous one ended, so every card is in
+    exactly one tile.
+
+    A frame whose shift is unclear, that scrolled back further than
+    `SEARCH_FRAMES` frame heights, or whose size changed, cannot be placed;
+    the panorama so far is flushed and a new one is started from it.
+    """
+
+    def __init__(self, tile_height: int = None):
+        self.tile_height = tile_height
+        self.frames = 0
+        self.segments = 0
+        self.frame_rows = 0
+        self.panorama_rows = 0
+        self.tiles = 0
+        self.tile_rows = 0
+        self._previous = None
+        self._rows = None
+        self._strip = None
+        self._strip_top = 0
+
+    def tiles_from_frames(self, frames):
+        """Turn `(frame_name, image)` pairs into `(tile_name, tile)` pairs."""
+        for frame_name, image in frames:
+            image = load_frame(image)
+            gray = to_gray(image)
+            strip = row_strip(gray)
+            self.frames += 1
+            self.frame_rows += image.shape[0]
+
+            position = None
+            if self._rows is not None and self._previous[0].shape == image.shape:
+                position = self._place(gray, strip)
+            if position is None:
+                yield from self._flush()
+                self._start(image, strip)
+                position = 0
+            else:
+                self._add(image, strip, position)
+            self._previous = (image, position, strip, gray)
+            yield from self._cut(final=False)
+        yield from self._flush()
+
+    def _place(self, gray, strip):
+        """Position of the frame's top row in the panorama, or None.
+
+        The frame is matched against the previous one first; if they do not
+        overlap (scrolled back, skipped ahead) it is looked up in the last
+        `SEARCH_FRAMES` frame heights of the panorama.
+        """
+        _, position, prev_strip, prev_gray = self._previous
+        min_overlap, separation = shift_limits(
+            find_cards(gray) + find_cards(prev_gray), len(gray)
+        )
+        shift = estimate_shift(prev_strip, strip, min_overlap, separation)
+        if shift is not None:
+            return position + shift
+
+        if len(self._strip) > 1:
+            self._strip = [tuple(np.concatenate(parts) for parts in zip(*self._strip))]
+        # Once trimmed, the strip no longer starts at the top of the list.
+        min_shift = 0 if self._strip_top else None
+        shift = estimate_shift(
+            self._strip[0], strip, min_overlap, separation, min_shift
+        )
+        if shift is None:
+            return None
+        # Strip row j is panorama row j + margin + `_strip_top`, like frame rows.
+        return self._strip_top + shift
+
+    def _start(self, image, strip):
+        """Begin a new panorama with the whole frame but its bottom margin."""
+        self.segments += 1
+        self._tile = self.tile_height or image.shape[0]
+        self._index = 0
+        self._top = 0
+        self._rows = image[: image.shape[0] - list_margin(image.shape[0])]
+        self._strip = [strip]
+        self._strip_top = 0
+
+    def _add(self, image, strip, position: int):
+        """Append the rows of a frame at `position` below the panorama."""
+        height = image.shape[0]
+        margin = list_margin(height)
+        bottom = self._top + len(self._rows)
+        first = max(bottom - position, margin)
+        last = height - margin
+        if first < last:
+            self._rows = np.concatenate([self._rows, image[first:last]])
+            self._strip.append(tuple(part[first - margin :] for part in strip))
+            self._trim_strip(SEARCH_FRAMES * height)
+
+    def _trim_strip(self, limit: int):
+        """Drop all but the last `limit` rows of the panorama's row strip."""
+        excess = sum(len(parts[0]) for parts in self._strip) - limit
+        while excess > 0:
+            rows = len(self._strip[0][0])
+            if rows <= excess:
+                self._strip.pop(0)
+                drop = rows
+            else:
+                self._strip[0] = tuple(part[excess:] for part in self._strip[0])
+                drop = excess
+            self._strip_top += drop
+            excess -= drop
+
+    def _cut(self, final: bool):
+        """Yield the complete tiles at the top of the panorama."""
+        while self._rows is not None and (
+            len(self._rows) > self._tile or (final and len(self._rows))
+        ):
+            window = self._rows[: self._tile]
+            cut = len(window)
+            if len(self._rows) > self._tile:
+                cut = self._cut_row(window)
+            tile = self._rows[:cut]
+            self._rows = self._rows[cut:]
+            self._top += cut
+            if cut < self._tile:
+                pad = self._tile - cut
+                tile = cv2.copyMakeBorder(tile, 0, pad, 0, 0, cv2.BORDER_REPLICATE)
+            self.tiles += 1
+            self.tile_rows += len(tile)
+            self._index += 1
+            yield f"panorama_{self.segments:02d}_{self._index:03d}", tile
+
+    def _cut_row(self, window):
+        """Row just below the last whole card in `window`, or its height."""
+        gray = to_gray(window)
+        height = len(window)
+        whole = [
+            card for card in find_cards(gray) if card[3] < height - list_margin(height)
+        ]
+        if not whole:
+            return height
+        return min(height, whole[-1][3] + BAND_PADDING)
+
+    def _flush(self):
+        """Tile the rest of the panorama, with the last frame's bottom margin."""
+        if self._rows is None:
+            return
+        image = self._previous[0]
+        height = image.shape[0]
+        self._rows = np.concatenate([self._rows, image[height - list_margin(height) :]])
+        self.panorama_rows += self._top + len(self._rows)
+        yield from self._cut(final=True)
+        self._rows = None
+        self._strip = None
+
+    def summary(self) -> str:
+        share = self.tile_rows / self.frame_rows if self.frame_rows else 0.0
+        return (
+            f"Panorama: {self.frames} frames stitched into {self.segments} "
+            f"panorama(s) of {self.panorama_rows} rows, read as {self.tiles} "
+            f"tiles ({share:.0%} of the frame rows)"
+        )
@@ -0,0 +1,111 @@
+import time
+from collections import deque
+
+
+def format_time(seconds):
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    return f"{hours:02}:{minutes:02}:{secs:02}"
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class ProgressReporter:
+    """Progress line with throughput, latency and ETA, printed at most every
+    `interval` seconds.
+
+    Call `update` once per processed item (or per batch with `count`) and
+    `skip` for items dropped without processing, then `finish` for the final
+    line; `summary` adds p50/p95 per-item latency to a step's summary.
+    Without `total` there is no percentage or ETA.
+    """
+
+    def __init__(
+        self,
+        log,
+        unit: str = "items",
+        total: int = None,
+        interval: float = 0.5,
+        window: int = 50,
+    ):
+        self.log = log
+        self.unit = unit
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.latencies = []
+        self._recent = deque(maxlen=window)
+        self._start = time.perf_counter()
+        self._last_item = self._start
+        self._last_report = None
+        self._reported_done = 0
+
+    def update(self, count: int = 1, latency: float = None):
+        """Record `count` finished items.
+
+        `latency` is the time per item; by default the time since the
+        previous update, split evenly over `count`.
+        """
+        now = time.perf_counter()
+        if count <= 0:
+            return
+        if latency is None:
+            latency = (now - self._last_item) / count
+        self._last_item = now
+        self.done += count
+        self.latencies.append(latency)
+        self._recent.append(latency)
+
+        if self._last_report is None or now - self._last_report >= self.interval:
+            self._last_report = now
+            self._reported_done = self.done
+            self.log(self.line(now))
+
+    def skip(self, count: int = 1):
+        """Count `count` items as done without recording a latency."""
+        if count > 0:
+            self.done += count
+
+    def line(self, now: float = None) -> str:
+        now = now or time.perf_counter()
+        elapsed = now - self._start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        average = sum(self._recent) / len(self._recent) if self._recent else 0.0
+
+        parts = []
+        if self.total:
+            parts.append(f"{self.done / self.total:.1%}")
+            parts.append(f"{self.done} / {self.total}")
+        else:
+            parts.append(f"{self.done}")
+        parts.append(f"{rate:.1f} {self.unit}/s")
+        parts.append(f"avg {average * 1000:.1f} ms")
+        parts.append(f"elapsed {format_time(elapsed)}")
+        if self.total and rate > 0:
+            remaining = max(self.total - self.done, 0) / rate
+            parts.append(f"ETA {format_time(remaining)}")
+        return "Progress: " + " | ".join(parts)
+
+    def finish(self):
+        """Print the final progress line if the last update was not shown."""
+        if self._reported_done != self.done:
+            self._last_report = self._last_item
+            self._reported_done = self.done
+            self.log(self.line(self._last_item))
+
+    def summary(self) -> str:
+        latencies = sorted(self.latencies)
+        elapsed = self._last_item - self._start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        return (
+            f"Throughput: {rate:.1f} {self.unit}/s "
+            f"| Latency p50: {percentile(latencies, 0.5) * 1000:.1f} ms, "
+            f"p95: {percentile(latencies, 0.95) * 1000:.1f} ms"
+        )
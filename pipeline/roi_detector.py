@@ -0,0 +1,121 @@
+import cv2
+import numpy as np
+
+# Probe frames are analysed at this width; the panel is large enough that
+# detail beyond this only costs time.
+PROBE_WIDTH = 480
+
+
+def crop_to_roi(frame, roi):
+    """Return the `(x, y, w, h)` region of `frame` (a view, not a copy)."""
+    if roi is None:
+        return frame
+    x, y, w, h = roi
+    return frame[y : y + h, x : x + w]
+
+
+def find_motion_bbox(grays, motion_threshold: int = 25, min_area_ratio: float = 0.1):
+    """Bounding box of the region that changes across `grays`, or None.
+
+    Only the achievement list scrolls while recording, so the union of the
+    frame-to-frame differences outlines the panel.
+    """
+    if len(grays) < 2:
+        return None
+
+    height, width = grays[0].shape
+    motion = np.zeros((height, width), dtype=np.uint8)
+    for prev, curr in zip(grays, grays[1:]):
+        motion = np.maximum(motion, cv2.absdiff(prev, curr))
+
+    mask = (motion > motion_threshold).astype(np.uint8) * 255
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 15))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+
+    x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+    if w * h < min_area_ratio * width * height:
+        return None
+    return x, y, w, h
+
+
+def find_layout_bbox(grays, min_area_ratio: float = 0.1):
+    """Bounding box of the largest right-side panel found from edges, or None.
+
+    Used when the probe frames do not scroll (e.g. the user starts still).
+    """
+    if not grays:
+        return None
+
+    height, width = grays[0].shape
+    median = np.median(np.stack(grays), axis=0).astype(np.uint8)
+    edges = cv2.Canny(median, 50, 150)
+    edges = cv2.dilate(edges, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 9)))
+
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    candidates = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w * h < min_area_ratio * width * height or w > 0.9 * width:
+            continue
+        if x + w / 2 < width / 2:
+            continue
+        candidates.append((w * h, (x, y, w, h)))
+
+    if not candidates:
+        return None
+    return max(candidates)[1]
+
+
+def detect_panel_roi(
+    cap,
+    probe_frames: int = 30,
+    padding: int = 4,
+    min_area_ratio: float = 0.1,
+):
+    """Find the achievement panel in the first `probe_frames` frames of `cap`.
+
+    Returns `(x, y, w, h)` in full-resolution pixels, or None when the
+    recording already shows only the panel. The capture is rewound to the
+    first frame afterwards.
+    """
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    scale = min(1.0, PROBE_WIDTH / width) if width else 1.0
+
+    grays = []
+    while len(grays) < probe_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if not width:
+            height, width = frame.shape[:2]
+            scale = min(1.0, PROBE_WIDTH / width)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if scale < 1.0:
+            gray = cv2.resize(
+                gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+            )
+        grays.append(gray)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    bbox = find_motion_bbox(grays, min_area_ratio=min_area_ratio)
+    if bbox is None:
+        bbox = find_layout_bbox(grays, min_area_ratio=min_area_ratio)
+    if bbox is None:
+        return None
+
+    x, y, w, h = (int(round(v / scale)) for v in bbox)
+    x0 = max(0, x - padding)
+    y0 = max(0, y - padding)
+    x1 = min(width, x + w + padding)
+    y1 = min(height, y + h + padding)
+
+    # Already-cropped recordings: keep the full frame.
+    if (x1 - x0) * (y1 - y0) >= 0.9 * width * height:
+        return None
+    return x0, y0, x1 - x0, y1 - y0
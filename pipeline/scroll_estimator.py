@@ -0,0 +1,81 @@
+import cv2
+import numpy as np
+
+# Phase correlation runs on a downscaled copy for a coarse offset, which is
+# then refined at full resolution on columns squeezed to `REFINE_WIDTH`.
+ESTIMATE_WIDTH = 320
+REFINE_WIDTH = 64
+# Rows this close to the top or bottom (share of the height) are left out
+# of the refinement: the ROI crop keeps static padding there.
+EDGE_ROWS = 0.04
+
+
+def _prepare(gray, scale):
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return np.float32(gray)
+
+
+def _refine(prev_gray, gray, offset: float, radius: int) -> float:
+    """Sub-pixel offset within `radius` rows of `offset`, by matching rows.
+
+    The downscaled peak is biased towards whole pixels of the small copy
+    (a 7 px scroll read as about 6.4 px at half size); here every whole
+    offset nearby is scored by the squared row difference at full
+    resolution and a parabola through the best three gives the fraction.
+    """
+    height, width = gray.shape[:2]
+    size = (min(REFINE_WIDTH, width), height)
+    prev = cv2.resize(prev_gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+    curr = cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+    edge = int(EDGE_ROWS * height)
+
+    def cost(shift):
+        top = edge + max(0, -shift)
+        bottom = height - edge - max(0, shift)
+        if bottom - top < height // 4:
+            return None
+        difference = prev[top + shift : bottom + shift] - curr[top:bottom]
+        return float(np.mean(difference * difference))
+
+    center = int(round(offset))
+    costs = {}
+    for shift in range(center - radius - 1, center + radius + 2):
+        value = cost(shift)
+        if value is not None:
+            costs[shift] = value
+    inner = [shift for shift in costs if abs(shift - center) <= radius]
+    if not inner:
+        return offset
+    best = min(inner, key=costs.get)
+    if best - 1 not in costs or best + 1 not in costs:
+        return float(best)
+    left, middle, right = costs[best - 1], costs[best], costs[best + 1]
+    curvature = left - 2 * middle + right
+    if curvature <= 0:
+        return float(best)
+    return best + 0.5 * (left - right) / curvature
+
+
+def estimate_scroll_offset(prev_gray, gray, max_width: int = ESTIMATE_WIDTH):
+    """Estimate how far the content moved vertically from `prev_gray` to `gray`.
+
+    Returns `(offset, response)`: `offset` is in full-resolution pixels and is
+    positive when the list scrolled down (content moved up); `response` is the
+    phase-correlation peak strength in [0, 1]. A low response means the two
+    frames are not a clean translation of each other (scene change, fast
+    scroll), and the offset should not be trusted.
+    """
+    height, width = gray.shape[:2]
+    scale = min(1.0, max_width / width)
+
+    prev = _prepare(prev_gray, scale)
+    curr = _prepare(gray, scale)
+    window = cv2.createHanningWindow((prev.shape[1], prev.shape[0]), cv2.CV_32F)
+    (dx, dy), response = cv2.phaseCorrelate(prev, curr, window)
+
+    # Shifts beyond half the panel alias with the periodic card layout.
+    if abs(dy) > prev.shape[0] / 2:
+        return 0.0, 0.0
+    radius = int(np.ceil(1 / scale))
+    return _refine(prev_gray, gray, -dy / scale, radius), float(response)
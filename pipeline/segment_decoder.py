@@ -0,0 +1,109 @@
+import cv2
+
+from pipeline.keyframe_selector import KeyframeSelector
+from pipeline.roi_detector import crop_to_roi
+
+# Segments shorter than this are not worth a process (seek + startup cost).
+MIN_SEGMENT_FRAMES = 120
+# Forward gaps up to this many frames are skipped with grab() instead of a seek.
+MAX_GRAB_GAP = 60
+
+
+def split_frame_ranges(total_frames: int, segments: int):
+    """Split `[0, total_frames)` into `segments` contiguous `(start, end)` ranges.
+
+    The last range has `end = None` so it reads to the real end of the video;
+    `CAP_PROP_FRAME_COUNT` is only an estimate for some containers.
+    """
+    segments = max(1, min(segments, total_frames // MIN_SEGMENT_FRAMES))
+    size = total_frames // segments
+    ranges = [(i * size, (i + 1) * size) for i in range(segments)]
+    ranges[-1] = (ranges[-1][0], None)
+    return ranges
+
+
+def _read_gray(cap, roi):
+    ret, frame = cap.read()
+    if not ret:
+        return None, None
+    frame = crop_to_roi(frame, roi)
+    return frame, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+def measure_segment(video_path: str, roi, start: int, end, selection_mode: str):
+    """Measure every frame in `[start, end)` against its predecessor.
+
+    Runs in a worker process. The segment starts one frame early so the
+    first frame of the range is diffed against the true previous frame.
+    Returns `(frame_num, diff_score, offset, response, height)` per frame;
+    `diff_score` is None for frame 0, which has no predecessor.
+    """
+    selector = KeyframeSelector(0, selection_mode)
+    cap = cv2.VideoCapture(video_path)
+    measurements = []
+    try:
+        prev_gray = None
+        if start > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start - 1)
+            _, prev_gray = _read_gray(cap, roi)
+
+        frame_num = start
+        while end is None or frame_num < end:
+            _, gray = _read_gray(cap, roi)
+            if gray is None:
+                break
+            if prev_gray is None:
+                measurements.append((frame_num, None, 0.0, 0.0, gray.shape[0]))
+            else:
+                _, diff_score, offset, response = selector.measure(prev_gray, gray)
+                measurements.append(
+                    (frame_num, diff_score, offset, response, gray.shape[0])
+                )
+            prev_gray = gray
+            frame_num += 1
+    finally:
+        cap.release()
+    return measurements
+
+
+def fetch_frames(video_path: str, roi, frame_nums, with_diff: bool = False):
+    """Decode the given (sorted) frames; runs in a worker process.
+
+    Returns `(frame_num, frame, diff)` per frame, where `diff` is the gray
+    diff map against the previous frame when `with_diff` is set.
+    """
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    try:
+        pos = None
+        last_num, last_gray = None, None
+        for frame_num in frame_nums:
+            prev_gray = None
+            target = frame_num
+            if with_diff and frame_num > 0:
+                if last_num == frame_num - 1:
+                    prev_gray = last_gray
+                else:
+                    target = frame_num - 1
+
+            if pos is None or target < pos or target - pos > MAX_GRAB_GAP:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                pos = target
+            while pos < target:
+                cap.grab()
+                pos += 1
+
+            if target < frame_num:
+                _, prev_gray = _read_gray(cap, roi)
+                pos += 1
+            frame, gray = _read_gray(cap, roi)
+            pos += 1
+            if frame is None:
+                break
+
+            diff = cv2.absdiff(prev_gray, gray) if prev_gray is not None else None
+            frames.append((frame_num, frame, diff))
+            last_num, last_gray = frame_num, gray
+    finally:
+        cap.release()
+    return frames
@@ -0,0 +1,151 @@
+import atexit
+import logging
+import os
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# Between INFO and WARNING: progress lines and summaries that are printed
+# even when per-frame/per-title messages are turned off.
+NOTICE = 25
+logging.addLevelName(NOTICE, "NOTICE")
+
+# A log file is flushed after this many records, or on the first record
+# once this many seconds have passed since the last flush.
+FLUSH_RECORDS = 256
+FLUSH_SECONDS = 1.0
+
+_queue = queue.SimpleQueue()
+_listener = None
+_file_handlers = {}
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """File handler that keeps its file open and flushes in batches.
+
+    `logging.FileHandler` flushes after every record; here the stream is
+    flushed every `batch_records` records, on the first record once
+    `batch_seconds` have passed since the last flush, on errors and on close.
+    There is no timer: a quiet log waits for its next record or for
+    `shutdown_logging`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_records: int = FLUSH_RECORDS,
+        batch_seconds: float = FLUSH_SECONDS,
+    ):
+        super().__init__(path, encoding="utf-8", delay=True)
+        self.batch_records = batch_records
+        self.batch_seconds = batch_seconds
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            self._unflushed += 1
+            if (
+                self._unflushed >= self.batch_records
+                or record.levelno >= logging.ERROR
+                or time.monotonic() - self._last_flush >= self.batch_seconds
+            ):
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        super().flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+
+def get_step_logger(name: str, log_file: str, console_level: int = logging.INFO):
+    """Logger for one pipeline step, writing to `log_file` and the console.
+
+    Console output is printed synchronously at `console_level` and above.
+    Every record (DEBUG and up) is also put on a shared queue; a background
+    listener thread writes it to the step's `BufferedFileHandler`, so logging
+    never waits on the disk. The file is created on the first record.
+    """
+    logger = logging.getLogger(f"pipeline.{name}")
+    if logger.handlers:
+        return logger
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(console_level)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(console)
+    logger.addHandler(QueueHandler(_queue))
+
+    log_dir = os.path.dirname(log_file)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+    file_handler = BufferedFileHandler(log_file)
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    # All steps share one queue; each file only takes its own logger's records.
+    file_handler.addFilter(logging.Filter(logger.name))
+    _file_handlers[logger.name] = file_handler
+    _start_listener()
+    return logger
+
+
+def set_console_level(logger: logging.Logger, level):
+    """Change the console threshold; `level` is a name ("DEBUG") or number."""
+    level = parse_level(level)
+    for handler in logger.handlers:
+        if not isinstance(handler, QueueHandler):
+            handler.setLevel(level)
+
+
+def parse_level(level) -> int:
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(str(level).upper())
+    if not isinstance(value, int):
+        raise ValueError(f"Unknown log level: {level}")
+    return value
+
+
+def level_from_settings(settings: dict) -> int:
+    """Console level from a step's `[settings]`.
+
+    `log_level` wins; older configs without it map `verbose = false` to
+    NOTICE and `log_skipped_frames = true` to DEBUG.
+    """
+    if "log_level" in settings:
+        return parse_level(settings["log_level"])
+    if settings.get("log_skipped_frames", False):
+        return logging.DEBUG
+    return logging.INFO if settings.get("verbose", True) else NOTICE
+
+
+def _start_listener():
+    global _listener
+    if _listener is not None:
+        # The listener reads `handlers` per record; swapping the tuple is safe.
+        _listener.handlers = tuple(_file_handlers.values())
+        return
+    _listener = QueueListener(
+        _queue, *_file_handlers.values(), respect_handler_level=True
+    )
+    _listener.start()
+
+
+def shutdown_logging():
+    """Drain the queue and flush and close every log file."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    for handler in _file_handlers.values():
+        handler.close()
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,112 @@
+import cv2
+import numpy as np
+
+from pipeline.frame_writer import load_frame, to_gray
+
+DEFAULT_TARGET_HEIGHT = 14
+DEFAULT_SAMPLE_FRAMES = 3
+# Scale factors are kept in this range, and closer than 10% to 1 is ignored.
+# Enlarging makes OCR slower, so frames are only enlarged (up to
+# `MAX_UPSCALE`) when asked to.
+MIN_SCALE = 0.25
+MAX_SCALE = 1.0
+MAX_UPSCALE = 1.5
+# A frame needs this many glyph-like components to be measured.
+MIN_GLYPHS = 20
+
+
+def measure_glyph_height(gray):
+    """Median height in pixels of the glyphs in a frame, or None.
+
+    Text is taken as the minority side of an Otsu threshold; its connected
+    components that are shaped like letters (not too wide, not too small,
+    nowhere near frame height) are the glyphs. The median is about the
+    x-height of the body text.
+    """
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if np.count_nonzero(mask) > mask.size / 2:
+        mask = cv2.bitwise_not(mask)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    heights = [
+        h
+        for _, _, w, h, area in stats[1:count]
+        if 4 <= h <= 0.2 * gray.shape[0] and w <= 3 * h and area >= 8
+    ]
+    if len(heights) < MIN_GLYPHS:
+        return None
+    return float(np.median(heights))
+
+
+class TextScaler:
+    """Rescales frames so their text is `target_height` pixels tall.
+
+    The glyph height is measured on the first `sample_frames` frames, so
+    a 4K recording is brought down to about the pixel count a 1080p one
+    would need and OCR cost no longer depends on the recording resolution.
+    Frames with smaller text are left alone unless `upscale` is set.
+    """
+
+    def __init__(
+        self,
+        target_height: float = DEFAULT_TARGET_HEIGHT,
+        sample_frames: int = DEFAULT_SAMPLE_FRAMES,
+        upscale: bool = False,
+    ):
+        self.target_height = target_height
+        self.sample_frames = sample_frames
+        self.max_scale = MAX_UPSCALE if upscale else MAX_SCALE
+        self.glyph_height = None
+        self.scale = 1.0
+
+    def _calibrate(self, images):
+        heights = []
+        for image in images:
+            height = measure_glyph_height(to_gray(image))
+            if height is not None:
+                heights.append(height)
+        if not heights:
+            return
+        self.glyph_height = float(np.median(heights))
+        scale = self.target_height / self.glyph_height
+        scale = min(self.max_scale, max(MIN_SCALE, scale))
+        if abs(scale - 1.0) >= 0.1:
+            self.scale = scale
+
+    def _resize(self, image):
+        if self.scale == 1.0:
+            return image
+        interpolation = cv2.INTER_AREA if self.scale < 1 else cv2.INTER_CUBIC
+        return cv2.resize(
+            image, None, fx=self.scale, fy=self.scale, interpolation=interpolation
+        )
+
+    def scale_frames(self, frames):
+        """Rescale `(frame_name, image)` pairs; paths are loaded here."""
+        frames = iter(frames)
+        sample = []
+        for frame_name, image in frames:
+            sample.append((frame_name, load_frame(image)))
+            if len(sample) >= self.sample_frames:
+                break
+        self._calibrate([image for _, image in sample])
+        for frame_name, image in sample:
+            yield frame_name, self._resize(image)
+        for frame_name, image in frames:
+            yield frame_name, self._resize(load_frame(image))
+
+    def to_frame(self, result):
+        """Map `readtext` boxes of a scaled frame back to the unscaled size."""
+        if self.scale == 1.0:
+            return result
+        return [
+            ([[x / self.scale, y / self.scale] for x, y in box], text, confidence)
+            for box, text, confidence in result
+        ]
+
+    def summary(self) -> str:
+        if self.glyph_height is None:
+            return "Text height: could not be measured, frames not scaled"
+        return (
+            f"Text height: {self.glyph_height:.1f} px measured, "
+            f"frames scaled by {self.scale:.2f} (target {self.target_height} px)"
+        )